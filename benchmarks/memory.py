@@ -0,0 +1,111 @@
+"""
+Measure the memory used by large numbers of the small objects that fairgraph
+creates when retrieving metadata from the Knowledge Graph.
+
+Each class is compared with an otherwise identical subclass that has a per-instance __dict__.
+
+We also measure the memory used by a synthetic crawl of File metadata, with and without
+the sharing of repeated strings (URIs, space names) between documents.
+
+Usage:
+
+    python benchmarks/memory.py [number_of_objects]
+"""
+
+import json
+import sys
+import tracemalloc
+
+from fairgraph.base import IRI
+from fairgraph.kgproxy import KGProxy
+from fairgraph.properties import Property
+from fairgraph.queries import Filter, QueryProperty
+from fairgraph.utility import LogEntry, InternTable
+from fairgraph.openminds.core import File, FileRepository
+
+
+def with_dict(cls):
+    return type(f"{cls.__name__}WithDict", (cls,), {})
+
+
+factories = {
+    KGProxy: lambda cls, i: cls(File, f"https://kg.ebrains.eu/api/instances/{i:032x}"),
+    IRI: lambda cls, i: cls(f"https://example.org/data/file{i}.nwb"),
+    Filter: lambda cls, i: cls("EQUALS", value=f"value{i}"),
+    QueryProperty: lambda cls, i: cls("https://openminds.ebrains.eu/vocab/name", name=f"name{i}"),
+    LogEntry: lambda cls, i: cls("File", f"https://kg.ebrains.eu/api/instances/{i:032x}", None, "myspace", "create"),
+    Property: lambda cls, i: cls(f"prop{i}", FileRepository, "vocab:fileRepository"),
+}
+
+
+def measure(factory, cls, n):
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    objects = [factory(cls, i) for i in range(n)]
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = end.compare_to(start, "filename")
+    total = sum(stat.size_diff for stat in stats)
+    del objects
+    return total / n
+
+
+def make_file_document(i):
+    """Return the JSON text of a File, as it might be returned by the KG"""
+    instances = "https://kg.ebrains.eu/api/instances/"
+    return json.dumps(
+        {
+            "@id": f"{instances}{i:032x}",
+            "@type": [File.type_],
+            "https://core.kg.ebrains.eu/vocab/meta/space": "dataset",
+            "https://openminds.ebrains.eu/vocab/name": f"file{i}.nwb",
+            "https://openminds.ebrains.eu/vocab/IRI": f"https://data-proxy.ebrains.eu/bucket/file{i}.nwb",
+            "https://openminds.ebrains.eu/vocab/format": {
+                "@id": f"{instances}00000000-0000-0000-0000-0000000000{i % 20:02d}",
+                "@type": ["https://openminds.ebrains.eu/core/ContentType"],
+            },
+            "https://openminds.ebrains.eu/vocab/fileRepository": {
+                "@id": f"{instances}00000000-0000-0000-0001-0000000000{i % 5:02d}",
+                "@type": ["https://openminds.ebrains.eu/core/FileRepository"],
+            },
+        }
+    )
+
+
+def measure_crawl(n):
+    texts = [make_file_document(i) for i in range(n)]
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    # each document is decoded separately, as if from a different response
+    files = [File.from_kg_instance(json.loads(text), client=None) for text in texts]
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in end.compare_to(start, "filename"))
+    del files
+    return total / n
+
+
+def main(n=100000):
+    print(f"Memory per object, averaged over {n} objects (including attribute values)\n")
+    print(f"{'class':<16}{'with __dict__':>16}{'with __slots__':>16}{'saving':>10}")
+    for cls, factory in factories.items():
+        unslotted = measure(factory, with_dict(cls), n)
+        slotted = measure(factory, cls, n)
+        print(f"{cls.__name__:<16}{unslotted:>14.0f} B{slotted:>14.0f} B{1 - slotted / unslotted:>10.0%}")
+
+    n_crawl = n // 10
+    print(f"\nMemory per File object in a crawl of {n_crawl} files\n")
+    shared = measure_crawl(n_crawl)
+    intern = InternTable.__call__
+    InternTable.__call__ = lambda self, value: value
+    try:
+        not_shared = measure_crawl(n_crawl)
+    finally:
+        InternTable.__call__ = intern
+    print(f"{'without sharing strings':<28}{not_shared:>10.0f} B")
+    print(f"{'with shared strings':<28}{shared:>10.0f} B{1 - shared / not_shared:>10.0%}")
+    assert shared < not_shared, "sharing strings between documents should reduce the memory used"
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
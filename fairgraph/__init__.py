@@ -22,9 +22,9 @@ limitations under the License.
 from .client import KGClient
 from .kgobject import KGObject
 from .embedded import EmbeddedMetadata
-from .kgproxy import KGProxy
+from .kgproxy import KGProxy, resolve_many
 from .kgquery import KGQuery
-from .base import IRI
+from .base import IRI, validate
 
 __version__ = "0.12.0"
 
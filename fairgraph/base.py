@@ -19,21 +19,29 @@ and contain code common to sub-classes, to avoid code duplication.
 
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional, Dict, List, Union, Any
+from collections import defaultdict
+from typing import TYPE_CHECKING, Optional, Dict, Iterable, Iterator, List, Tuple, Union, Any
 from typing_extensions import TypeAlias
+from contextlib import contextmanager
+from contextvars import ContextVar
 from copy import copy
 from enum import Enum
 import logging
 from warnings import warn
 
 from .registry import Registry
+from .caching import identity_scope
 from .queries import QueryProperty
-from .errors import ResolutionFailure, AuthorizationError, CannotBuildExistenceQuery
+from .errors import ResolutionFailure, AuthorizationError, CannotBuildExistenceQuery, DeadlineExceeded, ReleaseError
 from .utility import (
     as_list,  # temporary for backwards compatibility (a lot of code imports it from here)
     expand_uri,
     normalize_data,
-    invert_dict
+    invert_dict,
+    intern_uri,
+    intern_types,
+    parallel_map,
+    deadline,
 )
 
 if TYPE_CHECKING:
@@ -45,6 +53,73 @@ logger = logging.getLogger("fairgraph")
 
 JSONdict = Dict[str, Any]  # see https://github.com/python/typing/issues/182 for some possible improvements
 
+# keys used for the space of an object, in data retrieved from the KG
+SPACE_KEYS = ("https://core.kg.ebrains.eu/vocab/meta/space", "https://schema.hbp.eu/myQuery/space")
+
+
+
+class _InternedDocument(dict):
+    """A JSON-LD document whose keys and URIs are shared with other documents, see `_intern_document()`"""
+
+    __slots__ = ()
+
+
+def _intern_document(data: JSONdict) -> JSONdict:
+    """
+    Return a copy of a JSON-LD document in which keys, ids, types and space names are interned,
+    so that strings repeated in many documents are stored only once.
+
+    Nested documents are copied too, but other values are shared with the original document,
+    which is left unchanged. Documents which have already been interned are returned as they are.
+    """
+    if isinstance(data, _InternedDocument):
+        return data
+    document = _InternedDocument()
+    for key, value in data.items():
+        if key == "@type":
+            value = intern_types(value)
+        elif key == "@id" or key in SPACE_KEYS:
+            if isinstance(value, str):
+                value = intern_uri(value)
+        elif isinstance(value, dict):
+            value = _intern_document(value)
+        elif isinstance(value, list):
+            value = [_intern_document(item) if isinstance(item, dict) else item for item in value]
+        document[intern_uri(key)] = value
+    return document
+
+
+# when True, property values are not validated when constructing objects,
+# used for objects built from data retrieved from the KG.
+# When False, objects are validated even within trusted_construction(), used for data supplied by users
+_trusted_construction: ContextVar[Optional[bool]] = ContextVar("trusted_construction", default=None)
+
+
+@contextmanager
+def trusted_construction(trusted: bool = True):
+    """
+    Context manager within which metadata objects are created without validating their property values.
+
+    With `trusted=False`, property values are validated, even by code within the block
+    that would otherwise skip validation, e.g. :meth:`from_kg_instance()`.
+    """
+    if trusted and _trusted_construction.get() is False:
+        yield
+        return
+    token = _trusted_construction.set(trusted)
+    try:
+        yield
+    finally:
+        _trusted_construction.reset(token)
+
+
+def _get_type_from_data(data_item):
+    type_ = data_item.get("@type", None)
+    if type_:
+        return type_[0]
+    else:
+        return None
+
 
 class ErrorHandling(str, Enum):
     error = "error"
@@ -63,12 +138,16 @@ class ErrorHandling(str, Enum):
 
 
 class Resolvable:  # all
+    __slots__ = ()
+
     def resolve(
         self,
         client: KGClient,
         scope: Optional[str] = None,
         use_cache: bool = True,
         follow_links: Optional[Dict[str, Any]] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
     ):
         pass
 
@@ -85,12 +164,13 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
     aliases: Dict[str, str] = {}
 
     def __init__(self, data: Optional[Dict] = None, **properties):
+        trusted = _trusted_construction.get() is True
         properties_copy = copy(properties)
         for prop in self.__class__.all_properties:
             try:
                 val = properties[prop.name]
             except KeyError:
-                if prop.required:
+                if prop.required and not trusted:
                     msg = "Property '{}' is required.".format(prop.name)
                     ErrorHandling.handle_violation(prop.error_handling, msg)
                 val = None
@@ -102,7 +182,13 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
                     val = val()
             elif isinstance(val, (list, tuple)) and len(val) == 0:  # empty list
                 val = None
-            setattr(self, prop.name, val)
+            elif trusted and isinstance(val, list):
+                # copy, so that modifying the list in place does not modify the original document
+                val = list(val)
+            if trusted:
+                self.__dict__[prop.name] = val
+            else:
+                setattr(self, prop.name, val)
         for name_, alias_ in self.aliases.items():
             # the trailing underscores are because 'name' and 'alias' can be keys in 'properties'
             if name_ in properties_copy:
@@ -120,18 +206,54 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
                 )
 
         # we store the original remote data in `_raw_remote_data`
-        # and a normalized version in `remote_data`
-        self._raw_remote_data = data  # for debugging
-        self.remote_data = {}
-        if data:
-            self.remote_data = self.to_jsonld(include_empty_properties=True, follow_links=False)
+        # and a normalized version in `remote_data`.
+        # For objects built from KG documents, `remote_data` is only needed when saving,
+        # so it is computed lazily, from `_raw_remote_data`, which is left unchanged.
+        self._raw_remote_data = data
+        if not data:
+            self._remote_data = {}
+        elif trusted and "@type" in data:
+            self._remote_data = None
+        else:
+            self._remote_data = self.to_jsonld(include_empty_properties=True, follow_links=False)
+
+    @property
+    def remote_data(self) -> Optional[JSONdict]:
+        """The normalized JSON-LD representation of the object as it was when retrieved from the KG"""
+        if self._remote_data is None and self._raw_remote_data:
+            self._remote_data = self._remote_copy().to_jsonld(include_empty_properties=True, follow_links=False)
+        return self._remote_data
+
+    @remote_data.setter
+    def remote_data(self, value: Optional[JSONdict]):
+        self._remote_data = value
+
+    def _remote_copy(self) -> ContainsMetadata:
+        """
+        Return a copy of this object as it was when retrieved from the KG, i.e. with
+        the property values given by `_raw_remote_data`, regardless of any later changes.
+
+        The copy is initialized lazily, so properties are only deserialized when needed.
+        """
+        copy = object.__new__(self.__class__)
+        copy.__dict__.update(
+            (key, value) for key, value in self.__dict__.items() if key not in self._property_lookup
+        )
+        if "_lazy_state" not in self.__dict__:
+            data = self._raw_remote_data
+            D = self._normalize_document(data, include_id="@id" in data)
+            copy.__dict__["_lazy_state"] = (D, None, data.get("@id", None))
+        copy.__dict__["_remote_data"] = {}
+        return copy
 
     def __getattribute__(self, name):
         try:
             return object.__getattribute__(self, name)
         except AttributeError:
             if name in self.aliases:
-                return object.__getattribute__(self, self.aliases[name])
+                return getattr(self, self.aliases[name])
+            elif name in self._property_lookup and "_lazy_state" in self.__dict__:
+                return self._materialize(name)
             else:
                 raise
 
@@ -153,6 +275,8 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         follow_links: bool = False,
         include_empty_properties: bool = False,
         include_reverse_properties: bool = False,
+        flatten: bool = False,
+        serialization_context: Optional[SerializationContext] = None,
     ):
         """
         Return a JSON-LD representation of this metadata object
@@ -161,10 +285,31 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
             normalized (bool): Whether to expand all URIs. Defaults to True.
             follow_links (bool, optional): Whether to represent linked objects just by their "@id"
                 or to include their full metadata. Defaults to False.
+                Each linked object is included only once: where it appears again,
+                including in a cycle, it is represented just by its "@id".
             include_empty_properties (bool, optional): Whether to include empty properties (with value "null").
                 Defaults to False.
+            flatten (bool, optional): If True, return a document of the form {"@graph": [...]},
+                in which this object and all the linked objects are listed separately,
+                and refer to each other by "@id". Defaults to False.
+            serialization_context (SerializationContext, optional): Keeps track of the objects already
+                serialized. Pass the same context to several calls to share it between them.
 
         """
+        if serialization_context is None and (follow_links or flatten):
+            serialization_context = SerializationContext(flatten=flatten)
+            data = serialization_context.serialize(
+                self,
+                normalized=normalized,
+                follow_links=follow_links,
+                include_empty_properties=include_empty_properties,
+                include_reverse_properties=include_reverse_properties,
+            )
+            if flatten:
+                if data is not None and "@id" not in data:
+                    serialization_context.graph.insert(0, data)
+                return {"@graph": serialization_context.graph}
+            return data
         if self.properties:
             data: JSONdict = {"@type": [self.type_]}
             if hasattr(self, "id") and self.id:
@@ -174,7 +319,9 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
                     expanded_path = prop.expanded_path
                     value = getattr(self, prop.name)
                     if include_empty_properties or prop.required or value is not None:
-                        serialized = prop.serialize(value, follow_links=follow_links)
+                        serialized = prop.serialize(
+                            value, follow_links=follow_links, serialization_context=serialization_context
+                        )
                         if expanded_path in data:
                             if isinstance(data[expanded_path], list):
                                 data[expanded_path].append(serialized)
@@ -193,11 +340,14 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
     def from_jsonld(cls, data: JSONdict, client: KGClient, scope: Optional[str] = None):
         """
         Create an instance of the class from a JSON-LD document.
+
+        Unlike documents retrieved from the KG, the document is validated.
         """
-        if scope:
-            return cls.from_kg_instance(data, client, scope)
-        else:
-            return cls.from_kg_instance(data, client)
+        with trusted_construction(False):
+            if scope:
+                return cls.from_kg_instance(data, client, scope)
+            else:
+                return cls.from_kg_instance(data, client)
 
     @classmethod
     def from_kg_instance(cls, data: JSONdict, client: KGClient, scope: Optional[str] = None) -> ContainsMetadata:
@@ -251,6 +401,9 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         Normalize a dict containing filter key:value pairs so that it can be used
         in a call to the KG query API.
 
+        Lookups, such as ``{"name": {"startswith": "Virtual"}}``, are converted into
+        :class:`~fairgraph.queries.Filter` objects.
+
         Example:
             >>> import fairgraph.openminds.core as omcore
             >>> person = omcore.Person.from_uuid("045f846f-f010-4db8-97b9-b95b20970bf2", kg_client)
@@ -270,7 +423,10 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         for prop in cls.all_properties:
             if prop.name in filter_dict_copy:
                 value = filter_dict_copy[prop.name]
-                if isinstance(value, dict):
+                if prop.is_lookup(value):
+                    lookup, lookup_value = next(iter(value.items()))
+                    normalized[prop.name] = prop.get_lookup_filter(lookup, lookup_value)
+                elif isinstance(value, dict):
                     normalized[prop.name] = {}
                     for child_cls in prop.types:
                         normalized[prop.name].update(child_cls.normalize_filter(value))
@@ -279,26 +435,39 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         return normalized
 
     @classmethod
-    def generate_query_properties(cls, follow_links: Optional[Dict[str, Any]] = None):
+    def generate_query_properties(
+        cls,
+        follow_links: Optional[Dict[str, Any]] = None,
+        property_names: Optional[Union[List[str], Dict[str, Any]]] = None,
+    ):
         """
         Generate a list of QueryProperty instances for this class
         for use in constructing a KG query definition.
 
         Args:
             follow_links (dict): The links in the graph to follow when constructing the query. Defaults to None.
+            property_names (list of str or dict, optional): If provided, only these properties are included
+                in the query. This may also be a dict whose values select, in the same way, the properties
+                of the linked objects to include when following links, with None selecting all of them,
+                e.g. ``{"name": None, "custodians": {"family_name": None}}``.
         """
         properties = [QueryProperty("@type")]
         reverse_aliases = invert_dict(cls.aliases)
         for prop in cls.all_properties:
+            if property_names is not None and prop.name not in property_names:
+                continue
+            sub_names = property_names.get(prop.name) if isinstance(property_names, dict) else None
             if prop.is_link and follow_links:
                 if prop.name in follow_links:
-                    properties.extend(prop.get_query_properties(follow_links[prop.name]))
+                    properties.extend(prop.get_query_properties(follow_links[prop.name], property_names=sub_names))
                 elif reverse_aliases.get(prop.name, None) in follow_links:
-                    properties.extend(prop.get_query_properties(follow_links[reverse_aliases[prop.name]]))
+                    properties.extend(
+                        prop.get_query_properties(follow_links[reverse_aliases[prop.name]], property_names=sub_names)
+                    )
                 else:
-                    properties.extend(prop.get_query_properties())
+                    properties.extend(prop.get_query_properties(property_names=sub_names))
             else:
-                properties.extend(prop.get_query_properties())
+                properties.extend(prop.get_query_properties(property_names=sub_names))
         return properties
 
     @classmethod
@@ -320,56 +489,152 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         return properties
 
     @classmethod
-    def _deserialize_data(cls, data: JSONdict, client: KGClient, include_id: bool = False):
-        # normalize data by expanding keys
+    def _get_deserialization_plan(cls):
+        """
+        Return the information needed to deserialize JSON-LD documents into instances of this class.
+
+        This is computed once per class, and is a tuple containing:
+
+          - a dict mapping the keys found in incoming documents to their expanded form
+            and any type filter (for keys such as "vocab:hasPart__File"), or to None for keys
+            that should be ignored. Keys are added to this dict the first time they are seen.
+          - a dict containing, for each property name, the property, its expanded path and,
+            for reverse properties, the set of types that should be accepted.
+        """
+        plan = cls.__dict__.get("_deserialization_plan")
+        if plan is None:
+            property_plan = {}
+            for prop in cls.all_properties:
+                if prop.reverse:
+                    accepted_types = frozenset(t.type_ for t in prop.types)
+                else:
+                    accepted_types = None
+                property_plan[prop.name] = (prop, expand_uri(prop.path, cls.context), accepted_types)
+            plan = ({}, property_plan)
+            cls._deserialization_plan = plan
+        return plan
+
+    @classmethod
+    def _normalize_key(cls, key: str):
+        if "__" in key:
+            key, type_filter = key.split("__")
+            return intern_uri(expand_uri(key, cls.context)), type_filter
+        elif key.startswith("Q"):  # for 'Q' properties in data from queries
+            return key, None
+        elif key[0] != "@":
+            return intern_uri(expand_uri(key, cls.context)), None
+        else:
+            return None
+
+    @classmethod
+    def _normalize_document(cls, data: JSONdict, include_id: bool = False) -> JSONdict:
+        """Return a version of a JSON-LD document in which all keys are expanded."""
+        key_map = cls._get_deserialization_plan()[0]
         D = {"@type": data["@type"]}
         if include_id:
             D["@id"] = data["@id"]
         for key, value in data.items():
-            if "__" in key:
-                key, type_filter = key.split("__")
-                normalised_key = expand_uri(key, cls.context)
+            try:
+                normalised = key_map[key]
+            except KeyError:
+                normalised = key_map[key] = cls._normalize_key(key)
+            if normalised is None:
+                continue
+            normalised_key, type_filter = normalised
+            if type_filter is None:
+                D[normalised_key] = value
+            else:
                 value = [item for item in as_list(value) if item["@type"][0].endswith(type_filter)]
                 if normalised_key in D:
                     D[normalised_key].extend(value)
                 else:
                     D[normalised_key] = value
-            elif key.startswith("Q"):  # for 'Q' properties in data from queries
-                D[key] = value
-            elif key[0] != "@":
-                normalised_key = expand_uri(key, cls.context)
-                D[normalised_key] = value
         if cls.type_ not in D["@type"]:
             raise TypeError("type mismatch {} - {}".format(cls.type_, D["@type"]))
+        return D
 
-        def _get_type_from_data(data_item):
-            type_ = data_item.get("@type", None)
-            if type_:
-                return type_[0]
+    @classmethod
+    def _deserialize_property(cls, name: str, D: JSONdict, client: KGClient, belongs_to: Optional[str] = None):
+        """Deserialize a single property from a normalized JSON-LD document."""
+        prop, data_item = cls._extract_property_data(name, D)
+        return prop.deserialize(data_item, client, belongs_to=belongs_to)
+
+    @classmethod
+    def _extract_property_data(cls, name: str, D: JSONdict):
+        """Return the property with the given name, and its (JSON) data from a normalized JSON-LD document."""
+        prop, expanded_path, accepted_types = cls._get_deserialization_plan()[1][name]
+        data_item = D.get(expanded_path)
+        if data_item is not None and accepted_types is not None:
+            # for reverse properties, more than one property can have the same path
+            # so we extract only those sub-items whose types match
+            try:
+                data_item = [part for part in as_list(data_item) if _get_type_from_data(part) in accepted_types]
+            except AttributeError:
+                # problem when a forward and reverse path both given the same expanded path
+                # e.g. for Configuration
+                data_item = None
+        # sometimes queries put single items in a list, this removes the enclosing list
+        if (not prop.multiple) and isinstance(data_item, (list, tuple)) and len(data_item) == 1:
+            data_item = data_item[0]
+        return prop, data_item
+
+    @classmethod
+    def _deserialize_data(cls, data: JSONdict, client: KGClient, include_id: bool = False):
+        D = cls._normalize_document(data, include_id=include_id)
+        belongs_to = data.get("@id", None)
+        return {
+            name: cls._deserialize_property(name, D, client, belongs_to=belongs_to)
+            for name in cls._get_deserialization_plan()[1]
+        }
+
+    def _init_lazily(self, data: JSONdict, client: KGClient, include_id: bool = False):
+        """
+        Initialize an object from a JSON-LD document without deserializing its properties.
+
+        Each property is deserialized the first time it is accessed.
+        """
+        D = self._normalize_document(data, include_id=include_id)
+        self.__dict__.update(
+            _raw_remote_data=data,
+            _lazy_state=(D, client, data.get("@id", None)),
+            _remote_data=None,
+        )
+
+    def _materialize(self, name: str):
+        """Deserialize the property with the given name, for objects that were initialized lazily."""
+        D, client, belongs_to = self.__dict__["_lazy_state"]
+        # linked nodes should be shared only with other objects from the same scope
+        with identity_scope(self.__dict__.get("scope")):
+            value = self._deserialize_property(name, D, client, belongs_to=belongs_to)
+        # the following mirrors the handling of property values in __init__()
+        if value is None:
+            value = self._property_lookup[name].default
+            if callable(value):
+                value = value()
+        elif isinstance(value, (list, tuple)):
+            if len(value) == 0:
+                value = None
             else:
-                return None
+                # copy, so that modifying the list in place does not modify the document
+                value = list(value)
+        # as for other objects created from KG data, the value is not validated
+        self.__dict__[name] = value
+        return value
 
-        deserialized_data = {}
-        for prop in cls.all_properties:
-            expanded_path = expand_uri(prop.path, cls.context)
-            data_item = D.get(expanded_path)
-            if data_item is not None and prop.reverse:
-                # for reverse properties, more than one property can have the same path
-                # so we extract only those sub-items whose types match
-                try:
-                    data_item = [
-                        part for part in as_list(data_item)
-                        if _get_type_from_data(part) in [t.type_ for t in prop.types]
-                    ]
-                except AttributeError:
-                    # problem when a forward and reverse path both given the same expanded path
-                    # e.g. for Configuration
-                    data_item = None
-            # sometimes queries put single items in a list, this removes the enclosing list
-            if (not prop.multiple) and isinstance(data_item, (list, tuple)) and len(data_item) == 1:
-                data_item = data_item[0]
-            deserialized_data[prop.name] = prop.deserialize(data_item, client, belongs_to=data.get("@id", None))
-        return deserialized_data
+    def validate(self) -> List[str]:
+        """
+        Check the property values of this object.
+
+        Objects created from data retrieved from the KG are not validated when they are created,
+        this method can be used to check them.
+
+        Returns:
+            a list of error messages, which is empty if all property values are valid.
+        """
+        errors = []
+        for prop in self.__class__.all_properties:
+            errors.extend(prop.validate(getattr(self, prop.name)))
+        return errors
 
     def resolve(
         self,
@@ -377,6 +642,8 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         scope: Optional[str] = None,
         use_cache: bool = True,
         follow_links: Optional[Dict[str, Any]] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
     ):
         """
         Resolve properties that are represented by KGProxy objects.
@@ -387,52 +654,40 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
                    Valid values are 'released', 'in progress', 'any'.
             use_cache (bool): whether to use cached data if they exist. Defaults to True.
             follow_links (dict): The links in the graph to follow. Defaults to None.
+            max_workers (int, optional): The maximum number of requests to the KG to run concurrently
+                when following links. If not provided, `fairgraph.kgobject.MAX_CONCURRENT_QUERIES` is used.
+            timeout (float, optional): The maximum time, in seconds, for the whole operation.
+                If exceeded, DeadlineExceeded is raised. Links are followed level by level,
+                so the object will contain all the levels that were completed before the deadline.
 
         Note: a real (non-proxy) object resolves to itself.
         """
-        use_scope = scope or self.scope or "released"
         if follow_links:
-            reverse_aliases = invert_dict(self.__class__.aliases)
-            for prop in self.__class__.all_properties:
-                if prop.is_link:
-                    follow_name = None
-                    if prop.name in follow_links:
-                        follow_name = prop.name
-                    elif reverse_aliases.get(prop.name, None) in follow_links:
-                        follow_name = reverse_aliases[prop.name]
-
-                    if follow_name:
-                        if issubclass(prop.types[0], ContainsMetadata):
-                            values = getattr(self, prop.name)
-                            resolved_values: List[Any] = []
-                            for value in as_list(values):
-                                if isinstance(value, Resolvable):
-                                    if isinstance(value, ContainsMetadata) and isinstance(value, RepresentsSingleObject):
-                                        # i.e. isinstance(value, KGObject) - already resolved
-                                        resolved_values.append(value)
-                                    else:
-                                        try:
-                                            resolved_value = value.resolve(
-                                                client,
-                                                scope=use_scope,
-                                                use_cache=use_cache,
-                                                follow_links=follow_links[follow_name],
-                                            )
-                                        except ResolutionFailure as err:
-                                            warn(str(err))
-                                            resolved_values.append(value)
-                                        else:
-                                            resolved_values.append(resolved_value)
-                            if isinstance(values, RepresentsSingleObject):
-                                assert len(resolved_values) == 1
-                                setattr(self, prop.name, resolved_values[0])
-                            elif values is None:
-                                assert len(resolved_values) == 0
-                                setattr(self, prop.name, None)
-                            else:
-                                setattr(self, prop.name, resolved_values)
+            try:
+                with deadline(timeout):
+                    _resolve_breadth_first([(self, scope, follow_links)], client, use_cache, max_workers=max_workers)
+            except DeadlineExceeded as err:
+                err.partial_results = self
+                raise
         return self
 
+    def _links_to_follow(self, follow_links: Dict[str, Any]) -> Iterator[Tuple[Property, Dict[str, Any]]]:
+        """
+        For each link property which should be followed, according to `follow_links`,
+        yield the property and the links to follow from the linked objects.
+        """
+        reverse_aliases = invert_dict(self.__class__.aliases)
+        for prop in self.__class__.all_properties:
+            if prop.is_link:
+                follow_name = None
+                if prop.name in follow_links:
+                    follow_name = prop.name
+                elif reverse_aliases.get(prop.name, None) in follow_links:
+                    follow_name = reverse_aliases[prop.name]
+
+                if follow_name and issubclass(prop.types[0], ContainsMetadata):
+                    yield prop, follow_links[follow_name]
+
     def _build_existence_query(self) -> Union[None, Dict[str, Any]]:
         """
         Generate a KG query definition (as a JSON-LD document) that can be used to
@@ -469,6 +724,7 @@ class ContainsMetadata(Resolvable, metaclass=Registry):  # KGObject and Embedded
         return query
 
 class RepresentsSingleObject(Resolvable):  # KGObject, KGProxy
+    __slots__ = ()
     id: Optional[str]
     remote_data: Optional[JSONdict]
 
@@ -488,28 +744,91 @@ class RepresentsSingleObject(Resolvable):  # KGObject, KGProxy
             return False
 
     def release(self, client: KGClient, with_children: bool = False):
-        """Release this node (make it available in public search)."""
-        if not self.is_released(client, with_children=with_children):
-            if with_children:
-                for child in self.children(client):
-                    if not child.is_released(client, with_children=False):
-                        client.release(child.id)
+        """
+        Release this node (make it available in public search).
+
+        With `with_children`, the nodes linked from this one are also released.
+        For finer control, e.g. to include more distant nodes or to monitor progress,
+        use :class:`fairgraph.release.ReleasePlan`.
+        """
+        if with_children:
+            # a single request tells us if there is anything to do
+            if not self.is_released(client, with_children=True):
+                return self._execute_release_plan(client, "release")
+        elif not self.is_released(client):
             return client.release(self.id)
 
     def unrelease(self, client: KGClient, with_children: bool = False):
         """Un-release this node (remove it from public search)."""
-        response = client.unrelease(self.id)
         if with_children:
-            for child in self.children(client):
-                client.unrelease(child.id)
-        return response
+            return self._execute_release_plan(client, "unrelease")
+        else:
+            return client.unrelease(self.id)
+
+    def _execute_release_plan(self, client: KGClient, action: str):
+        from .release import ReleasePlan
+
+        plan = ReleasePlan(self, client, action=action)
+        if not plan.execute():
+            errors = "; ".join(f"{id}: {err}" for id, err in plan.failures.items())
+            raise ReleaseError(f"Unable to {action} {len(plan.failures)} node(s). {errors}", failures=plan.failures)
+        # as without `with_children`, return the response for this node
+        return plan.responses.get(plan.root.id)
 
 
 class SupportsQuerying:  # KGObject, KGQuery
     pass
 
 
+class SerializationContext:
+    """
+    Keeps track of the objects serialized during a call to :meth:`to_jsonld()`,
+    so that each object is serialized only once.
+
+    Objects with an "@id" are serialized in full the first time they are encountered,
+    and then represented by a reference, {"@id": ...}, which also avoids infinite recursion
+    for cyclic graphs. If `flatten` is True, all objects with an "@id" are collected in `graph`,
+    and only references to them are embedded.
+
+    Objects without an "@id" (new objects not yet saved, and embedded metadata)
+    cannot be referenced, and so are embedded wherever they appear.
+    """
+
+    def __init__(self, flatten: bool = False):
+        self.flatten = flatten
+        self.graph: List[Optional[JSONdict]] = []
+        self._seen: set = set()
+        # serialized objects without an "@id", by Python id; None while serialization is in progress
+        self._anonymous: Dict[int, Optional[JSONdict]] = {}
+
+    def serialize(self, obj: ContainsMetadata, **kwargs) -> Optional[JSONdict]:
+        """Return the JSON-LD representation of `obj`, or a reference to it if it has already been serialized."""
+        uri = getattr(obj, "id", None)
+        if uri:
+            if uri in self._seen:
+                return {"@id": uri}
+            self._seen.add(uri)
+            if self.flatten:
+                # reserve a place, so that objects are listed before the objects they link to
+                index = len(self.graph)
+                self.graph.append(None)
+                self.graph[index] = obj.to_jsonld(serialization_context=self, **kwargs)
+                return {"@id": uri}
+            return obj.to_jsonld(serialization_context=self, **kwargs)
+        else:
+            key = id(obj)
+            if key in self._anonymous:
+                if self._anonymous[key] is None:
+                    raise ValueError("Unable to serialize a cycle of objects which do not have an id")
+                return self._anonymous[key]
+            self._anonymous[key] = None
+            self._anonymous[key] = data = obj.to_jsonld(serialization_context=self, **kwargs)
+            return data
+
+
 class IRI:
+    __slots__ = ("value",)
+
     def __init__(self, value: Union[str, IRI]):
         if isinstance(value, IRI):
             iri = value.value
@@ -530,3 +849,118 @@ class IRI:
 
     def to_jsonld(self):
         return self.value
+
+
+def _resolve_breadth_first(
+    level: List[Tuple[ContainsMetadata, Optional[str], Dict[str, Any]]],
+    client: KGClient,
+    use_cache: bool = True,
+    max_workers: Optional[int] = None,
+):
+    """
+    Resolve links level by level, starting from the given (object, scope, follow_links) tuples.
+
+    All the proxies found at a given depth, across all objects, are resolved together
+    using :func:`resolve_many()`, before moving on to the next depth.
+    The resulting graph is the same as when following links depth-first from each object.
+
+    All requests are dispatched from the calling thread, so worker threads never
+    wait on each other, and at most `max_workers` requests are in flight at once.
+    """
+    from .kgproxy import resolve_many
+
+    if max_workers is None:
+        from .kgobject import MAX_CONCURRENT_QUERIES as max_workers
+
+    while level:
+        next_level = []
+        seen = set()
+        # proxies to resolve at this depth, with where to put the resolved objects
+        pending: Dict[str, List[Tuple[Any, List[Any], int, Dict[str, Any]]]] = defaultdict(list)
+        # queries to resolve at this depth, likewise
+        pending_queries: List[Tuple[Any, List[Any], int, str, Dict[str, Any]]] = []
+        assignments = []
+        for obj, scope, follow_links in level:
+            if (id(obj), id(follow_links)) in seen:
+                continue
+            seen.add((id(obj), id(follow_links)))
+            use_scope = scope or obj.scope or "released"
+            for prop, sub_follow_links in obj._links_to_follow(follow_links):
+                values = getattr(obj, prop.name)
+                resolved_values: List[Any] = []
+                for value in as_list(values):
+                    if isinstance(value, Resolvable):
+                        if isinstance(value, ContainsMetadata) and isinstance(value, RepresentsSingleObject):
+                            # i.e. isinstance(value, KGObject) - already resolved
+                            resolved_values.append(value)
+                        elif isinstance(value, ContainsMetadata):
+                            # embedded metadata, whose links are followed at the next level
+                            resolved_values.append(value)
+                            if sub_follow_links:
+                                next_level.append((value, use_scope, sub_follow_links))
+                        elif isinstance(value, RepresentsSingleObject):
+                            # i.e. isinstance(value, KGProxy)
+                            pending[use_scope].append((value, resolved_values, len(resolved_values), sub_follow_links))
+                            resolved_values.append(value)
+                        else:
+                            # i.e. isinstance(value, KGQuery)
+                            pending_queries.append(
+                                (value, resolved_values, len(resolved_values), use_scope, sub_follow_links)
+                            )
+                            resolved_values.append(value)
+                assignments.append((obj, prop, values, resolved_values))
+
+        for use_scope, proxies in pending.items():
+            results = resolve_many(
+                [item[0] for item in proxies], client, scope=use_scope, use_cache=use_cache, max_workers=max_workers
+            )
+            for (proxy, resolved_values, index, sub_follow_links), result in zip(proxies, results):
+                if isinstance(result, ResolutionFailure):
+                    warn(str(result))
+                else:
+                    resolved_values[index] = result
+                    if sub_follow_links:
+                        next_level.append((result, use_scope, sub_follow_links))
+
+        def _resolve_query(item):
+            query, _, _, use_scope, sub_follow_links = item
+            try:
+                # links from the query results are followed within the query itself
+                # we are already in a worker thread, so the query should not start any more
+                return query.resolve(
+                    client, scope=use_scope, use_cache=use_cache, follow_links=sub_follow_links, max_workers=1
+                )
+            except ResolutionFailure as err:
+                warn(str(err))
+                return query
+
+        for (_, resolved_values, index, _, _), result in zip(
+            pending_queries, parallel_map(_resolve_query, pending_queries, max_workers=max_workers)
+        ):
+            resolved_values[index] = result
+
+        for obj, prop, values, resolved_values in assignments:
+            if isinstance(values, RepresentsSingleObject):
+                assert len(resolved_values) == 1
+                setattr(obj, prop.name, resolved_values[0])
+            elif values is None:
+                assert len(resolved_values) == 0
+                setattr(obj, prop.name, None)
+            else:
+                setattr(obj, prop.name, resolved_values)
+        level = next_level
+
+
+def validate(objects: Iterable[ContainsMetadata]) -> List[Tuple[ContainsMetadata, List[str]]]:
+    """
+    Check the property values of a collection of metadata objects.
+
+    Returns:
+        a list of (object, error messages) tuples, one for each object that has invalid property values.
+    """
+    results = []
+    for obj in objects:
+        errors = obj.validate()
+        if errors:
+            results.append((obj, errors))
+    return results
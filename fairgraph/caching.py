@@ -18,7 +18,11 @@ to avoid making unnecessary API calls.
 # limitations under the License.
 
 from collections import defaultdict
-from typing import Dict, Any, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+from typing import Dict, Any, Iterator, Optional, Tuple, Union
+from weakref import WeakValueDictionary
 
 
 def generate_cache_key(qd: Dict[str, str]) -> Tuple:
@@ -50,3 +54,98 @@ def generate_cache_key(qd: Dict[str, str]) -> Tuple:
 
 object_cache: Dict[str, Any] = {}  # for caching based on object ids
 save_cache: Dict[type, Dict[Tuple, str]] = defaultdict(dict)  # for caching based on queries
+
+# objects may be resolved in several threads at once, so updates of the object cache
+# that involve more than a single dict operation should hold this lock
+cache_lock = threading.RLock()
+
+# maps ids to objects, so that nodes that appear several times in the same response
+# (for example when following links) are deserialized only once
+_identity_map: ContextVar[Optional[Dict[str, Any]]] = ContextVar("identity_map", default=None)
+
+# the scope of the data currently being deserialized, if known
+_identity_scope: ContextVar[Optional[str]] = ContextVar("identity_scope", default=None)
+
+
+class SharedObjects:
+    """
+    The identity map of a client created with `share_objects=True`,
+    used for all the responses received by that client.
+
+    Objects are stored separately for each scope, so that the released and in-progress versions
+    of a node are not confused. Only weak references are held, so an object is dropped from
+    the map as soon as it is no longer used elsewhere.
+    """
+
+    def __init__(self):
+        self._by_scope: Dict[Optional[str], WeakValueDictionary] = {}
+        self._lock = threading.Lock()
+
+    def for_scope(self, scope: Optional[str]) -> WeakValueDictionary:
+        """Return the mapping from ids to objects for the given scope."""
+        with self._lock:
+            try:
+                return self._by_scope[scope]
+            except KeyError:
+                mapping = self._by_scope[scope] = WeakValueDictionary()
+                return mapping
+
+    def discard(self, id: str):
+        """Remove the object with the given id, in all scopes."""
+        with self._lock:
+            for mapping in self._by_scope.values():
+                mapping.pop(id, None)
+
+    def clear(self):
+        with self._lock:
+            self._by_scope.clear()
+
+    def __len__(self):
+        return sum(len(mapping) for mapping in self._by_scope.values())
+
+
+@contextmanager
+def identity_map(mapping: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Context manager within which KG objects built from data with the same id are shared.
+
+    If `mapping` is not given, any identity map that is already active is reused,
+    otherwise a new, empty one is created.
+    """
+    if mapping is None:
+        mapping = _identity_map.get()
+        if mapping is not None:
+            yield mapping
+            return
+        mapping = {}
+    token = _identity_map.set(mapping)
+    try:
+        yield mapping
+    finally:
+        _identity_map.reset(token)
+
+
+@contextmanager
+def identity_scope(scope: Optional[str]) -> Iterator[None]:
+    """Context manager indicating the scope of the data being deserialized, if different from the current one."""
+    if scope is None or scope == _identity_scope.get():
+        yield
+        return
+    token = _identity_scope.set(scope)
+    try:
+        yield
+    finally:
+        _identity_scope.reset(token)
+
+
+def get_identity_map(client: Any = None) -> Optional[Union[Dict[str, Any], WeakValueDictionary]]:
+    """
+    Return the identity map of the client, if it has one, for the current scope,
+    or else the currently active identity map, if any.
+    """
+    mapping = getattr(client, "identity_map", None)
+    if isinstance(mapping, SharedObjects):
+        return mapping.for_scope(_identity_scope.get())
+    if mapping is None:
+        mapping = _identity_map.get()
+    return mapping
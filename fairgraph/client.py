@@ -21,10 +21,13 @@ EBRAINS KG core API.
 from __future__ import annotations
 import os
 import logging
+import threading
 from typing import Any, Dict, Iterable, List, Optional, Union, TYPE_CHECKING
 from uuid import uuid4, UUID
 
 try:
+    import requests
+    from urllib3.exceptions import ReadTimeoutError
     from kg_core.kg import kg
     from kg_core.request import Stage, Pagination, ExtendedResponseConfiguration, ReleaseTreeScope
     from kg_core.response import ResultPage, JsonLdDocument, SpaceInformation
@@ -33,7 +36,9 @@ try:
 except ImportError:
     have_kg_core = False
 
-from .errors import AuthenticationError, AuthorizationError, ResourceExistsError
+from .errors import AuthenticationError, AuthorizationError, ResourceExistsError, DeadlineExceeded
+from .utility import deadline, remaining_time
+from .caching import SharedObjects
 
 if TYPE_CHECKING:
     from .kgobject import KGObject
@@ -47,6 +52,45 @@ except ImportError:
 logger = logging.getLogger("fairgraph")
 
 
+def _with_deadline(do_request):
+    """
+    Wrap the `_do_request()` method of a kg_core API object, which does not set a timeout on its requests,
+    so that while a deadline is active (see :func:`fairgraph.utility.deadline`),
+    the time remaining is passed to each request as its timeout.
+    """
+
+    def _do_request(args, payload):
+        remaining = remaining_time()
+        if remaining is None:
+            return do_request(args, payload)
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        # kg_core passes `args` on to requests.request()
+        args["timeout"] = remaining
+        try:
+            return do_request(args, payload)
+        except requests.Timeout as err:
+            raise DeadlineExceeded("Deadline exceeded while waiting for a response from the KG") from err
+        except requests.ConnectionError as err:
+            # responses are streamed, and a timeout while reading the body is reported as a ConnectionError
+            if (err.args and isinstance(err.args[0], ReadTimeoutError)) or remaining_time() <= 0:
+                raise DeadlineExceeded("Deadline exceeded while reading a response from the KG") from err
+            raise
+        finally:
+            # kg_core keeps the arguments, for requesting further pages
+            args.pop("timeout", None)
+
+    return _do_request
+
+
+def _apply_deadlines(kg_client):
+    """Make the requests made by a kg_core client (or by its API objects) respect the current deadline"""
+    for api in (kg_client, *vars(kg_client).values()):
+        if hasattr(api, "_do_request"):
+            api._do_request = _with_deadline(api._do_request)
+    return kg_client
+
+
 if have_kg_core:
     STAGE_MAP = {
         "released": Stage.RELEASED,
@@ -87,6 +131,11 @@ class KGClient(object):
                               and "core.kg.ebrains.eu" to work with the production KG.
         client_id (str, optional): For use together with client_secret in place of the token if you have a service account.
         client_secret (str, optional): The client secret to use for authentication. Required if client_id is provided.
+        share_objects (bool, optional): If True, a node retrieved several times with this client, when following links,
+                                        is represented by a single Python object, stored in `identity_map`
+                                        for as long as it is in use. Objects are shared only within a scope,
+                                        and are dropped when the node is updated or deleted with this client.
+                                        Otherwise (the default), this is the case only within a single response.
 
     Raises:
         ImportError: If the kg_core package is not installed.
@@ -99,6 +148,7 @@ class KGClient(object):
         host: str = "core.kg-ppd.ebrains.eu",
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
+        share_objects: bool = False,
     ):
         if not have_kg_core:
             raise ImportError(
@@ -115,20 +165,38 @@ class KGClient(object):
                 self._kg_client_builder = kg(host).with_token(os.environ["KG_AUTH_TOKEN"])
             except KeyError:
                 raise AuthenticationError("Need to provide either token or client id/secret.")
-        self._kg_client = self._kg_client_builder.build()
+        self._kg_client = _apply_deadlines(self._kg_client_builder.build())
         self.__kg_admin_client = None
         self.host = host
         self._user_info = None
         self.cache: Dict[str, JsonLdDocument] = {}
+        # instances may be retrieved from several threads at once (see resolve_many())
+        self._cache_lock = threading.Lock()
         self._query_cache: Dict[str, str] = {}
         self.accepted_terms_of_use = False
+        self.identity_map: Optional[SharedObjects] = SharedObjects() if share_objects else None
 
     @property
     def _kg_admin_client(self):
         if self.__kg_admin_client is None:
-            self.__kg_admin_client = self._kg_client_builder.build_admin()
+            self.__kg_admin_client = _apply_deadlines(self._kg_client_builder.build_admin())
         return self.__kg_admin_client
 
+    def batching(self, max_workers: Optional[int] = None):
+        """
+        Return a context manager within which resolving KGProxy objects with this client is deferred,
+        so that the objects can be retrieved in bulk.
+
+        See :func:`fairgraph.kgproxy.batching` for details.
+
+        Example:
+            >>> with client.batching():
+            ...     licenses = [dataset.license.resolve(client) for dataset in datasets]
+        """
+        from .kgproxy import batching
+
+        return batching(self, max_workers=max_workers)
+
     @property
     def token(self) -> Optional[str]:
         return self._kg_client.instances._kg_config.token_handler._fetch_token()
@@ -164,6 +232,7 @@ class KGClient(object):
         scope: str = "released",
         id_key: str = "@id",
         use_stored_query: bool = False,
+        timeout: Optional[float] = None,
     ) -> ResultPage[JsonLdDocument]:
         """
         Execute a Knowledge Graph (KG) query with the given filters and query definition.
@@ -178,6 +247,8 @@ class KGClient(object):
             scope (str): The scope of the query. Valid values are "released", "in progress", or "any". Default is "released".
             id_key (str): The key that identifies the ID of a JSON-LD document. Default is "@id".
             use_stored_query (bool): Whether to use a stored query with the given query_id instead of a dynamic query. Default is False.
+            timeout (float, optional): The maximum time, in seconds, to wait for the results.
+                If exceeded, DeadlineExceeded is raised. See also :func:`fairgraph.utility.deadline`.
 
         Returns:
             A ResultPage object containing a list of JSON-LD instances that satisfy the query,
@@ -211,28 +282,29 @@ class KGClient(object):
                 error_context = f"_query(scope={scope} query_id={query_id} filter={filter} instance_id={instance_id} size={size} from_index={from_index})"
                 return self._check_response(response, error_context=error_context)
 
-        if scope == "any":
-            # the following implementation is simple but very inefficient
-            # because we retrieve _all_ instances and then apply the limits
-            # from_index and size.
-            # todo: make this more efficient, but be sure to clearly
-            #       explain the algorithm
-            instances = {}
-            # first we get the released instances
-            response = _query("released", 0, 100000)
-            for instance in response.data:
-                instances[instance[id_key]] = instance
-            # now we get the "in progress" instances, and overwrite
-            # any existing released instances which have the same id
-            response = _query("in progress", 0, 100000)
-            for instance in response.data:
-                instances[instance[id_key]] = instance
-            response.data = list(instances.values())[from_index : from_index + size]
-            response.size = len(response.data)
-            response.total = len(instances)
-            return response
-        else:
-            return _query(scope, from_index, size)
+        with deadline(timeout):
+            if scope == "any":
+                # the following implementation is simple but very inefficient
+                # because we retrieve _all_ instances and then apply the limits
+                # from_index and size.
+                # todo: make this more efficient, but be sure to clearly
+                #       explain the algorithm
+                instances = {}
+                # first we get the released instances
+                response = _query("released", 0, 100000)
+                for instance in response.data:
+                    instances[instance[id_key]] = instance
+                # now we get the "in progress" instances, and overwrite
+                # any existing released instances which have the same id
+                response = _query("in progress", 0, 100000)
+                for instance in response.data:
+                    instances[instance[id_key]] = instance
+                response.data = list(instances.values())[from_index : from_index + size]
+                response.size = len(response.data)
+                response.total = len(instances)
+                return response
+            else:
+                return _query(scope, from_index, size)
 
     def list(
         self,
@@ -297,6 +369,7 @@ class KGClient(object):
         use_cache: bool = True,
         scope: str = "released",
         require_full_data: bool = True,
+        timeout: Optional[float] = None,
     ) -> JsonLdDocument:
         """
         Return a specific KG instance identified by its URI.
@@ -307,6 +380,8 @@ class KGClient(object):
             scope: The scope of instances to include in the response.
                    Valid values are 'released', 'in progress', 'any'.
             require_full_data: Whether to only return instances for which the user has full read access.
+            timeout: The maximum time, in seconds, to wait for the instance.
+                If exceeded, DeadlineExceeded is raised.
         """
         logger.debug("Retrieving instance from {}, api='core' use_cache={}".format(uri, use_cache))
         data: JsonLdDocument
@@ -336,19 +411,89 @@ class KGClient(object):
                     data = None
                 return data
 
-            if scope == "any":
-                data_ip = _get_instance("in progress")
-                data_rel = _get_instance("released")
-                data = data_rel or data_ip
-                if data_ip is not None:
-                    data.update(data_ip)
-            else:
-                data = _get_instance(scope)
+            with deadline(timeout):
+                if scope == "any":
+                    data_ip = _get_instance("in progress")
+                    data_rel = _get_instance("released")
+                    data = data_rel or data_ip
+                    if data_ip is not None:
+                        data.update(data_ip)
+                else:
+                    data = _get_instance(scope)
 
             if data:
-                self.cache[uri] = data
+                with self._cache_lock:
+                    self.cache[uri] = data
         return data
 
+    def instances_from_full_uris(
+        self,
+        uris: Iterable[str],
+        use_cache: bool = True,
+        scope: str = "released",
+        require_full_data: bool = True,
+    ) -> Dict[str, Optional[JsonLdDocument]]:
+        """
+        Return several KG instances, identified by their URIs, using a single request.
+
+        Args:
+            uris: The global identifiers of the instances
+            use_cache: whether to use cached data if they exist. Defaults to True.
+            scope: The scope of instances to include in the response.
+                   Valid values are 'released', 'in progress', 'any'.
+            require_full_data: Whether to only return instances for which the user has full read access.
+
+        Returns:
+            a dict mapping each URI to the instance data, or to None if the instance could not be retrieved.
+        """
+        uris = list(uris)
+        logger.debug("Retrieving {} instances, api='core' use_cache={}".format(len(uris), use_cache))
+        results: Dict[str, Optional[JsonLdDocument]] = {}
+        to_fetch = []
+        for uri in uris:
+            if use_cache and uri in self.cache:
+                results[uri] = self.cache[uri]
+            else:
+                to_fetch.append(uri)
+        if not to_fetch:
+            return results
+
+        def _get_instances(scope):
+            uuids = {str(self.uuid_from_uri(uri)): uri for uri in to_fetch}
+            response = self._kg_client.instances.get_by_ids(
+                stage=STAGE_MAP[scope],
+                payload=list(uuids),
+                extended_response_configuration=default_response_configuration,
+            )
+            instances = {}
+            for uuid, result in (response.data or {}).items():
+                data = result.data if result.error is None else None
+                # see instance_from_full_uri() about "minimal" metadata
+                if require_full_data and data and "http://schema.org/identifier" not in data:
+                    data = None
+                instances[uuids.get(uuid, uuid)] = data
+            return instances
+
+        if scope == "any":
+            instances_ip = _get_instances("in progress")
+            instances_rel = _get_instances("released")
+            for uri in to_fetch:
+                data_ip = instances_ip.get(uri)
+                data = instances_rel.get(uri) or data_ip
+                if data_ip is not None:
+                    data.update(data_ip)
+                results[uri] = data
+        else:
+            instances = _get_instances(scope)
+            for uri in to_fetch:
+                results[uri] = instances.get(uri)
+
+        with self._cache_lock:
+            for uri in to_fetch:
+                if results[uri]:
+                    self.cache[uri] = results[uri]
+        return results
+
     def create_new_instance(
         self, data: JsonLdDocument, space: str, instance_id: Optional[str] = None
     ) -> JsonLdDocument:
@@ -393,6 +538,7 @@ class KGClient(object):
             extended_response_configuration=default_response_configuration,
         )
         error_context = f"update_instance(data={data}, instance_id={instance_id})"
+        self._discard_shared_object(instance_id)
         return self._check_response(response, error_context=error_context).data
 
     def replace_instance(self, instance_id: str, data: JsonLdDocument) -> JsonLdDocument:
@@ -409,6 +555,7 @@ class KGClient(object):
             extended_response_configuration=default_response_configuration,
         )
         error_context = f"replace_instance(data={data}, instance_id={instance_id})"
+        self._discard_shared_object(instance_id)
         return self._check_response(response, error_context=error_context).data
 
     def delete_instance(self, instance_id: str, ignore_not_found: bool = True):
@@ -416,9 +563,15 @@ class KGClient(object):
         Delete a KG instance.
         """
         response = self._kg_client.instances.delete(instance_id)
+        self._discard_shared_object(instance_id)
         # response is None if no errors
         return response
 
+    def _discard_shared_object(self, instance_id: Union[str, UUID]):
+        """Drop a modified or deleted instance from the identity map, so that it is retrieved afresh."""
+        if self.identity_map is not None:
+            self.identity_map.discard(self.uri_from_uuid(str(instance_id)))
+
     def uri_from_uuid(self, uuid: str) -> str:
         """Return an instance's URI given its UUID."""
         namespace = self._kg_client.instances._kg_config.id_namespace
@@ -619,6 +772,35 @@ class KGClient(object):
         else:
             raise AuthorizationError("You are not able to access the release status")
 
+    def are_released(self, uris: Iterable[str], with_children: bool = False) -> Dict[str, Optional[bool]]:
+        """
+        Release status of several KG instances, retrieved with a single request.
+
+        Args:
+            uris (list of URI): persistent identifiers of the instances.
+            with_children (bool): whether to check if all the children of each instance
+                                  have also been released.
+
+        Returns:
+            a dict mapping each URI to True if the instance (and optionally all its children)
+            has been released, False if not, or None if the release status could not be accessed.
+        """
+        if with_children:
+            release_tree_scope = ReleaseTreeScope.CHILDREN_ONLY
+        else:
+            release_tree_scope = ReleaseTreeScope.TOP_INSTANCE_ONLY
+        uuids = {str(self.uuid_from_uri(uri)): uri for uri in uris}
+        response = self._kg_client.instances.get_release_status_by_ids(
+            payload=list(uuids), release_tree_scope=release_tree_scope
+        )
+        statuses: Dict[str, Optional[bool]] = {uri: None for uri in uuids.values()}
+        for uuid, result in (response.data or {}).items():
+            if result.data in ("RELEASED", "HAS_CHANGED"):
+                statuses[uuids.get(uuid, uuid)] = True
+            elif result.data == "UNRELEASED":
+                statuses[uuids.get(uuid, uuid)] = False
+        return statuses
+
     def release(self, uri: str):
         """Release the instance with the given uri"""
         response = self._kg_client.instances.release(self.uuid_from_uri(uri))
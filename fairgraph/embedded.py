@@ -24,7 +24,7 @@ from typing import Optional, TYPE_CHECKING, Union
 from warnings import warn
 
 from .utility import as_list, ActivityLog
-from .base import Resolvable, ContainsMetadata, JSONdict
+from .base import Resolvable, ContainsMetadata, JSONdict, trusted_construction, _intern_document
 
 if TYPE_CHECKING:
     from .client import KGClient
@@ -75,8 +75,10 @@ class EmbeddedMetadata(ContainsMetadata, Resolvable):
         if "@id" in data:
             warn("Expected embedded metadata, but received @id")
             return None
+        data = _intern_document(data)
         deserialized_data = cls._deserialize_data(data, client)
-        return cls(data=data, **deserialized_data)
+        with trusted_construction():
+            return cls(data=data, **deserialized_data)
 
     def save(
         self,
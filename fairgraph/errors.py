@@ -45,3 +45,28 @@ class CannotBuildExistenceQuery(Exception):
     """Raised when it is not possible to build an existence query"""
 
     pass
+
+
+class ReleaseError(Exception):
+    """
+    Raised when some of the nodes in a release (or unrelease) could not be processed.
+
+    The `failures` attribute maps the ids of these nodes to the errors encountered.
+    """
+
+    def __init__(self, *args, failures=None):
+        super().__init__(*args)
+        self.failures = failures or {}
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when an operation does not complete within the time allowed.
+
+    Where possible, the results obtained before the deadline are available
+    in the `partial_results` attribute.
+    """
+
+    def __init__(self, *args, partial_results=None):
+        super().__init__(*args)
+        self.partial_results = partial_results
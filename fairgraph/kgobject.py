@@ -23,7 +23,8 @@ from collections import defaultdict
 import logging
 from uuid import UUID
 from warnings import warn
-from typing import Any, Tuple, Dict, List, Optional, TYPE_CHECKING, Union
+from itertools import islice
+from typing import Any, Callable, Tuple, Dict, Iterator, List, Optional, TYPE_CHECKING, Union
 
 from requests.exceptions import HTTPError
 
@@ -33,12 +34,43 @@ try:
     have_tabulate = True
 except ImportError:
     have_tabulate = False
-from .utility import expand_uri, as_list, expand_filter, ActivityLog
+try:
+    import pandas as pd
+
+    have_pandas = True
+except ImportError:
+    have_pandas = False
+from .utility import (
+    expand_uri,
+    as_list,
+    expand_filter,
+    split_filter,
+    normalize_data,
+    parallel_map,
+    iterate_with_deadline,
+    ActivityLog,
+)
 from .registry import lookup_type
-from .queries import Query
-from .errors import AuthorizationError, ResourceExistsError, CannotBuildExistenceQuery
-from .caching import object_cache, save_cache, generate_cache_key
-from .base import RepresentsSingleObject, ContainsMetadata, SupportsQuerying, IRI, JSONdict
+from .queries import Query, FILTER_LOOKUPS
+from .errors import (
+    AuthorizationError,
+    ResourceExistsError,
+    CannotBuildExistenceQuery,
+    ResolutionFailure,
+    DeadlineExceeded,
+)
+from .caching import object_cache, save_cache, generate_cache_key, identity_map, identity_scope
+from .base import (
+    ErrorHandling,
+    RepresentsSingleObject,
+    ContainsMetadata,
+    SupportsQuerying,
+    IRI,
+    JSONdict,
+    trusted_construction,
+    _intern_document,
+    _resolve_breadth_first,
+)
 from .kgproxy import KGProxy
 from .kgquery import KGQuery
 
@@ -49,6 +81,11 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("fairgraph")
 
+# list-valued filters with more than this number of items are split into several queries
+FILTER_CHUNK_SIZE = 100
+# maximum number of such queries to run concurrently
+MAX_CONCURRENT_QUERIES = 4
+
 
 class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
     """
@@ -103,10 +140,24 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
         return self._space
 
     @classmethod
-    def from_kg_instance(cls, data: JSONdict, client: KGClient, scope: Optional[str] = None):
-        """Create an instance of the class from a JSON-LD document."""
+    def from_kg_instance(cls, data: JSONdict, client: KGClient, scope: Optional[str] = None, lazy: bool = False):
+        """
+        Create an instance of the class from a JSON-LD document.
+
+        If `lazy` is True, the properties of the object are deserialized only when they are first accessed.
+        This is much faster when only a few properties of each object will be used.
+        Note that in this case the property values are only checked when they are accessed.
+        """
+        # the document is retained in `_raw_remote_data`, so we keep a copy in which repeated URIs are shared
+        data = _intern_document(data)
+        if lazy:
+            obj = cls.__new__(cls)
+            obj.__dict__.update(id=data["@id"], _space=None, scope=scope, allow_update=True)
+            obj._init_lazily(data, client, include_id=True)
+            return obj
         deserialized_data = cls._deserialize_data(data, client, include_id=True)
-        return cls(id=data["@id"], data=data, scope=scope, **deserialized_data)
+        with trusted_construction():
+            return cls(id=data["@id"], data=data, scope=scope, **deserialized_data)
 
     # @classmethod
     # def _fix_keys(cls, data):
@@ -160,6 +211,10 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             data = client.instance_from_full_uri(uri, use_cache=use_cache, scope=scope)
         if data is None:
             return None
+        elif follow_links:
+            # linked nodes that appear several times in the response are deserialized only once
+            with identity_map(), identity_scope(scope):
+                return cls.from_kg_instance(data, client, scope=scope)
         else:
             return cls.from_kg_instance(data, client, scope=scope)
 
@@ -260,23 +315,34 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
         # todo: also count 'lookup_name' as an alias
         if "short_name" not in cls.property_names:
             raise AttributeError(f"{cls.__name__} doesn't have an 'alias' or 'short_name' property")
-        candidates = as_list(
-            cls.list(
-                client,
-                size=20,
-                from_index=0,
-                api="query",
-                scope=scope,
-                space=space,
-                alias=alias,
-                follow_links=follow_links,
-            )
+        candidates = cls.list(
+            client,
+            size=1,
+            from_index=0,
+            api="query",
+            scope=scope,
+            space=space,
+            alias__exact=alias,
+            follow_links=follow_links,
+        )
+        if len(candidates) == 1:
+            return candidates[0]
+        # no exact match, so we fall back to a "contains" lookup, which can give multiple results
+        candidates = cls.list(
+            client,
+            size=20,
+            from_index=0,
+            api="query",
+            scope=scope,
+            space=space,
+            alias=alias,
+            follow_links=follow_links,
         )
         if len(candidates) == 0:
             return None
         elif len(candidates) == 1:
             return candidates[0]
-        else:  # KG query does a "contains" lookup, so can get multiple results
+        else:
             for candidate in candidates:
                 if candidate.alias == alias:
                     return candidate
@@ -308,8 +374,13 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
         scope: str = "released",
         space: Optional[str] = None,
         follow_links: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        lazy: bool = False,
+        raw: bool = False,
+        prefetch: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
         **filters,
-    ) -> List[KGObject]:
+    ) -> Union[List[KGObject], List[JSONdict]]:
         """
         List all objects of this type in the Knowledge Graph
 
@@ -321,7 +392,21 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             scope (str, optional): The scope to use for the query. Can be 'released', 'in progress', or 'all'. Default is 'released'.
             space (str, optional): The KG space to be queried. If not specified, results from all accessible spaces will be included.
             follow_links (dict): The links in the graph to follow. Defaults to None.
+            order_by (str, optional): The name of a property to sort the results by, e.g. "release_date".
+                Prefix the name with "-" to sort in descending order, e.g. "-release_date".
+                If not specified, results are sorted by name, where this is available.
+            lazy (bool): If True, the properties of each object are deserialized only when first accessed.
+                This is faster if only a few properties of each object will be used. Defaults to False.
+            raw (bool): If True, return normalized JSON-LD documents (with expanded keys) rather than
+                KGObject instances. Defaults to False.
+            prefetch (list of str, optional): The names of link properties whose values should be retrieved
+                after listing, in bulk, for all the objects at once (see :meth:`load_links`).
+                This is an alternative to `follow_links` which keeps the query itself small.
+            timeout (float, optional): The maximum time, in seconds, for the whole operation.
+                If exceeded, DeadlineExceeded is raised, with the objects retrieved so far as `partial_results`.
             filters: Optional keyword arguments representing filters to apply to the query.
+                A filter value may be a list, in which case objects matching any of the values are returned.
+                Long lists are split into several smaller queries, which are run concurrently.
 
         Returns:
             A list of instances of this class representing the objects returned by the KG query.
@@ -344,32 +429,463 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
 
         """
 
+        results = []
+        try:
+            for obj in cls.iterate(
+                client,
+                size=size,
+                from_index=from_index,
+                api=api,
+                scope=scope,
+                space=space,
+                follow_links=follow_links,
+                page_size=size,
+                order_by=order_by,
+                lazy=lazy,
+                raw=raw,
+                prefetch=prefetch,
+                timeout=timeout,
+                **filters,
+            ):
+                results.append(obj)
+        except DeadlineExceeded as err:
+            err.partial_results = results
+            raise
+        return results
+
+    @classmethod
+    def iterate(
+        cls,
+        client: KGClient,
+        size: Optional[int] = None,
+        from_index: int = 0,
+        api: str = "auto",
+        scope: str = "released",
+        space: Optional[str] = None,
+        follow_links: Optional[Dict[str, Any]] = None,
+        page_size: int = 100,
+        order_by: Optional[str] = None,
+        lazy: bool = False,
+        raw: bool = False,
+        prefetch: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        **filters,
+    ) -> Union[Iterator[KGObject], Iterator[JSONdict]]:
+        """
+        Iterate over objects of this type in the Knowledge Graph.
+
+        This takes the same arguments as :meth:`list`, but results are retrieved from
+        the KG page by page, as they are needed, rather than all at once.
+
+        Args:
+            client: KGClient object that handles the communication with the KG.
+            size (int, optional): The maximum number of instances to return. Default is to return all instances.
+            from_index (int, optional): The index of the first instance to return. Default is 0.
+            api (str): The KG API to use for the query. Can be 'query', 'core', or 'auto'. Default is 'auto'.
+            scope (str, optional): The scope to use for the query. Can be 'released', 'in progress', or 'all'. Default is 'released'.
+            space (str, optional): The KG space to be queried. If not specified, results from all accessible spaces will be included.
+            follow_links (dict): The links in the graph to follow. Defaults to None.
+            page_size (int, optional): The number of instances to retrieve with each request to the KG. Default is 100.
+            order_by (str, optional): The name of a property to sort the results by. Prefix with "-" for descending order.
+            lazy (bool): If True, the properties of each object are deserialized only when first accessed.
+            raw (bool): If True, yield normalized JSON-LD documents rather than KGObject instances.
+            prefetch (list of str, optional): The names of link properties whose values should be retrieved
+                in bulk, page by page.
+            timeout (float, optional): The maximum time, in seconds, for the whole iteration.
+                If exceeded, DeadlineExceeded is raised.
+            filters: Optional keyword arguments representing filters to apply to the query.
+
+        Example:
+
+            >>> import fairgraph.openminds.core as omcore
+            >>> for file in omcore.File.iterate(client, file_repository=repository):
+            ...     print(file.name)
+        """
+        if prefetch and raw:
+            raise ValueError("'prefetch' cannot be used together with 'raw'")
+        if timeout is not None:
+            # the deadline must only apply while we are retrieving results, not while the caller is using them
+            yield from iterate_with_deadline(
+                cls.iterate(
+                    client,
+                    size=size,
+                    from_index=from_index,
+                    api=api,
+                    scope=scope,
+                    space=space,
+                    follow_links=follow_links,
+                    page_size=page_size,
+                    order_by=order_by,
+                    lazy=lazy,
+                    raw=raw,
+                    prefetch=prefetch,
+                    **filters,
+                ),
+                timeout,
+            )
+            return
+        count = 0
+        page: List[KGObject] = []
+        for instance in cls._iter_instances(
+            client,
+            size=size,
+            from_index=from_index,
+            api=api,
+            scope=scope,
+            space=space,
+            follow_links=follow_links,
+            page_size=page_size,
+            order_by=order_by,
+            filters=filters,
+        ):
+            if raw:
+                yield cls._normalize_raw_document(instance)
+            else:
+                # linked nodes that appear several times within a page of results are deserialized only once
+                if count % page_size == 0:
+                    shared_objects: Dict[str, Any] = {}
+                count += 1
+                with identity_map(shared_objects), identity_scope(scope):
+                    obj = cls.from_kg_instance(instance, client, scope=scope, lazy=lazy)
+                if prefetch:
+                    # linked objects are retrieved for a whole page at once
+                    page.append(obj)
+                    if len(page) == page_size:
+                        cls.load_links(page, prefetch, client, scope=scope)
+                        yield from page
+                        page = []
+                else:
+                    yield obj
+        if page:
+            cls.load_links(page, prefetch, client, scope=scope)
+            yield from page
+
+    @classmethod
+    def _normalize_raw_document(cls, data: JSONdict) -> JSONdict:
+        """Return a JSON-LD document from the KG with all keys expanded, and with the context attached."""
+        document = normalize_data(data, cls.context)
+        document.setdefault("@context", cls.context)
+        return document
+
+    @classmethod
+    def list_table(
+        cls,
+        client: KGClient,
+        columns: List[str],
+        size: Optional[int] = None,
+        from_index: int = 0,
+        scope: str = "released",
+        space: Optional[str] = None,
+        page_size: int = 100,
+        order_by: Optional[str] = None,
+        as_dataframe: Optional[bool] = None,
+        **filters,
+    ):
+        """
+        Retrieve selected properties of instances of this class, as a table.
+
+        This is much more efficient than :meth:`list()` when only a few properties are needed,
+        since only those properties are retrieved from the KG, and no Python objects are created
+        for the individual instances. Results are retrieved page by page.
+
+        Args:
+            client: KGClient object that handles the communication with the KG.
+            columns (list of str): The names of the properties to retrieve.
+                For properties that link to other KG objects, the column contains the ids of those objects.
+                Properties of linked objects can be retrieved by using a dotted path, e.g. "custodians.family_name".
+                The special name "id" gives the ids of the instances themselves.
+                A column of the form "count(<path>)" gives the number of values, e.g. "count(repository.files)"
+                gives the number of files, without retrieving anything but their ids.
+            size (int, optional): The maximum number of rows to return. By default, all rows are returned.
+            from_index (int): The index of the first row to return. Defaults to 0.
+            scope (str): The scope of instances to include in the response.
+                Valid values are 'released', 'in progress', 'any'. Defaults to 'released'.
+            space (str, optional): The KG space to be queried. If not specified, results from all
+                accessible spaces will be included.
+            page_size (int, optional): The number of instances to retrieve with each request to the KG.
+            order_by (str, optional): The name of a property to sort the results by. Prefix with "-" for descending order.
+            as_dataframe (bool, optional): Whether to return a pandas DataFrame. By default, a DataFrame is returned
+                if pandas is installed, otherwise a dict of lists.
+            filters: Optional keyword arguments representing filters to apply to the query.
+
+        Returns:
+            A dict containing a list of values for each column, or a pandas DataFrame.
+
+        Example:
+
+            >>> import fairgraph.openminds.core as omcore
+            >>> table = omcore.DatasetVersion.list_table(
+            ...     client,
+            ...     columns=["id", "short_name", "release_date", "accessibility.name", "count(repository.files)"],
+            ... )
+        """
+        if as_dataframe is None:
+            as_dataframe = have_pandas
+        elif as_dataframe and not have_pandas:
+            raise ImportError("Please install pandas to obtain results as a DataFrame")
+
+        # work out which properties need to be included in the query, and which links must be followed
+        column_paths = {}
+        counted = set()
+        follow_links: Dict[str, Any] = {}
+        # for each link that is followed, only the properties needed for the columns are retrieved
+        selected: Dict[str, Any] = {}
+        for column in columns:
+            if column == "id":
+                column_paths[column] = None
+                continue
+            dotted_path = column
+            if column.startswith("count(") and column.endswith(")"):
+                dotted_path = column[len("count(") : -1]
+                counted.add(column)
+            path = []
+            target_cls = cls
+            follow = follow_links
+            select = selected
+            for i, name in enumerate(dotted_path.split(".")):
+                name = target_cls.aliases.get(name, name)
+                if name not in target_cls._property_lookup:
+                    raise ValueError(f"{target_cls.__name__} does not have a property named '{name}'")
+                path.append(name)
+                if i < dotted_path.count("."):
+                    prop = target_cls._property_lookup[name]
+                    if not prop.is_link:
+                        raise ValueError(f"Invalid column '{column}': '{name}' is not a link to another object")
+                    follow = follow.setdefault(name, {})
+                    if select.get(name) is None:
+                        select[name] = {}
+                    select = select[name]
+                    target_cls = prop.types[0]
+                elif target_cls._property_lookup[name].is_link and issubclass(
+                    target_cls._property_lookup[name].types[0], KGObject
+                ):
+                    # only the ids of linked objects are needed, unless other columns select more
+                    select.setdefault(name, {})
+                else:
+                    select.setdefault(name, None)
+            column_paths[column] = path
+
+        def make_query(chunk):
+            return cls.generate_query(
+                space=space,
+                client=client,
+                filters=chunk,
+                follow_links=follow_links or None,
+                order_by=order_by,
+                property_names=selected,
+            )
+
+        table: Dict[str, List[Any]] = {column: [] for column in columns}
+        for instance in cls._iter_query_instances(
+            client, make_query, filters, from_index, size, page_size, scope, order_by=order_by
+        ):
+            D = cls._normalize_document(instance, include_id=True)
+            for column, path in column_paths.items():
+                if path is None:
+                    table[column].append(instance["@id"])
+                elif column in counted:
+                    table[column].append(_count_values(cls._get_table_value(D, path, client)))
+                else:
+                    table[column].append(cls._get_table_value(D, path, client))
+        if as_dataframe:
+            return pd.DataFrame(table, columns=columns)
+        return table
+
+    @classmethod
+    def _get_table_value(cls, D: JSONdict, path: List[str], client: KGClient):
+        """
+        Return the value of the property given by `path` (a list of property names, for following links)
+        from a normalized JSON-LD document, for use in :meth:`list_table()`.
+        """
+        prop, data_item = cls._extract_property_data(path[0], D)
+        if data_item is None or data_item == []:
+            return None
+        if len(path) > 1:
+            values = []
+            for item in as_list(data_item):
+                if isinstance(item, dict) and "@type" in item:
+                    target_cls = prop.types[0]
+                    if len(prop.types) > 1:
+                        target_cls = next((t for t in prop.types if t.type_ in item["@type"]), target_cls)
+                    item_D = target_cls._normalize_document(item)
+                    values.append(target_cls._get_table_value(item_D, path[1:], client))
+                else:
+                    values.append(None)
+            return values if isinstance(data_item, (list, tuple)) else values[0]
+        elif prop.is_link and not issubclass(prop.types[0], KGObject):
+            # embedded metadata, which do not have ids
+            return data_item
+        elif prop.is_link:
+            ids = [item.get("@id") if isinstance(item, dict) else item for item in as_list(data_item)]
+            return ids if isinstance(data_item, (list, tuple)) else ids[0]
+        elif prop.types[0] == IRI:
+            return data_item
+        else:
+            return prop.deserialize(data_item, client)
+
+    @classmethod
+    def _iter_instances(
+        cls,
+        client: KGClient,
+        size: Optional[int],
+        from_index: int,
+        api: str,
+        scope: str,
+        space: Optional[str],
+        follow_links: Optional[Dict[str, Any]],
+        page_size: int,
+        filters: Dict[str, Any],
+        order_by: Optional[str] = None,
+    ) -> Iterator[JSONdict]:
+        """
+        Yield the JSON-LD documents of instances of this type, retrieving them page by page.
+        """
         if api == "auto":
-            if filters:
+            if filters or order_by:
                 api = "query"
             else:
                 api = "core"
 
         if api == "query":
-            query = cls.generate_query(space=space, client=client, filters=filters, follow_links=follow_links)
-            instances = client.query(
-                query=query,
-                from_index=from_index,
-                size=size,
-                scope=scope,
-            ).data
-            for instance in instances:
-                instance["@context"] = cls.context
+
+            def make_query(chunk):
+                return cls.generate_query(
+                    space=space, client=client, filters=chunk, follow_links=follow_links, order_by=order_by
+                )
+
+            yield from cls._iter_query_instances(
+                client, make_query, filters, from_index, size, page_size, scope, order_by=order_by
+            )
         elif api == "core":
             if filters:
                 raise ValueError("Cannot use filters with api='core'")
             if follow_links:
                 raise NotImplementedError("Following links with api='core' not yet implemented")
-            instances = client.list(cls.type_, space=space, from_index=from_index, size=size, scope=scope).data
+            if order_by:
+                raise ValueError("Cannot use order_by with api='core'")
+
+            def get_page(start, page_size):
+                return client.list(cls.type_, space=space, from_index=start, size=page_size, scope=scope)
+
+            yield from cls._iter_pages(get_page, from_index, size, page_size)
         else:
             raise ValueError("'api' must be either 'query', 'core', or 'auto'")
 
-        return [cls.from_kg_instance(instance, client, scope=scope) for instance in instances]
+    @classmethod
+    def _iter_query_instances(
+        cls,
+        client: KGClient,
+        make_query,
+        filters: Dict[str, Any],
+        from_index: int,
+        size: Optional[int],
+        page_size: int,
+        scope: str,
+        order_by: Optional[str] = None,
+    ) -> Iterator[JSONdict]:
+        """
+        Yield the results of the query generated by `make_query(filters)`, retrieving them page by page.
+
+        List-valued filters with more than FILTER_CHUNK_SIZE items are split into several queries,
+        which are run concurrently, at most MAX_CONCURRENT_QUERIES at a time. Their results are merged,
+        removing duplicates, and returned as soon as the results of the preceding sub-queries have been returned.
+
+        The KG can only sort in ascending order, so for descending order we retrieve the
+        corresponding range from the end of the ascending results, and reverse it.
+        """
+        descending = False
+        if order_by:
+            sort_property, descending = cls._parse_order_by(order_by)
+        filter_chunks = split_filter(filters, FILTER_CHUNK_SIZE)
+        if len(filter_chunks) == 1:
+            query = make_query(filters)
+            if descending:
+                total = client.query(query=query, from_index=0, size=1, scope=scope).total
+                stop = max(total - from_index, 0)
+                start = 0 if size is None else max(stop - size, 0)
+                instances = list(cls._iter_query_pages(client, query, start, stop - start, page_size, scope))
+                yield from reversed(instances)
+            else:
+                yield from cls._iter_query_pages(client, query, from_index, size, page_size, scope)
+        else:
+            # each sub-query must return enough results to fill the requested range
+            # even if there is a lot of overlap between sub-queries
+            if size is None or descending:
+                limit = None
+            else:
+                limit = from_index + size
+
+            def run_sub_query(chunk):
+                return list(cls._iter_query_pages(client, make_query(chunk), 0, limit, page_size, scope))
+
+            def unique(results):
+                seen = set()
+                for instances in results:
+                    for instance in instances:
+                        if instance["@id"] not in seen:
+                            seen.add(instance["@id"])
+                            yield instance
+
+            instances = unique(parallel_map(run_sub_query, filter_chunks, max_workers=MAX_CONCURRENT_QUERIES))
+            if order_by:
+                # each sub-query is sorted, but we need to sort the merged results
+                key = sort_property.path
+
+                def sort_key(instance):
+                    return (instance.get(key) is None, instance.get(key))
+
+                instances = sorted(instances, key=sort_key, reverse=descending)
+            yield from islice(instances, from_index, None if size is None else from_index + size)
+
+    @classmethod
+    def _parse_order_by(cls, order_by: str) -> Tuple[Property, bool]:
+        """Return the property to sort by and whether the sort order is descending"""
+        descending = order_by.startswith("-")
+        name = order_by.lstrip("-")
+        if "__" in name:
+            raise ValueError("Sorting by properties of linked objects is not supported")
+        name = cls.aliases.get(name, name)
+        try:
+            prop = cls._property_lookup[name]
+        except KeyError:
+            raise ValueError(f"Cannot sort by '{name}': {cls.__name__} does not have a property with this name")
+        if prop.is_link or not prop.intrinsic:
+            raise ValueError(f"Cannot sort by '{name}': sorting is only possible on properties with simple values")
+        return prop, descending
+
+    @classmethod
+    def _iter_query_pages(
+        cls,
+        client: KGClient,
+        query: JSONdict,
+        from_index: int,
+        size: Optional[int],
+        page_size: int,
+        scope: str,
+    ) -> Iterator[JSONdict]:
+        def get_page(start, page_size):
+            return client.query(query=query, from_index=start, size=page_size, scope=scope)
+
+        for instance in cls._iter_pages(get_page, from_index, size, page_size):
+            instance["@context"] = cls.context
+            yield instance
+
+    @staticmethod
+    def _iter_pages(get_page, from_index: int, size: Optional[int], page_size: int) -> Iterator[JSONdict]:
+        n_retrieved = 0
+        while size is None or n_retrieved < size:
+            if size is None:
+                this_page_size = page_size
+            else:
+                this_page_size = min(page_size, size - n_retrieved)
+            response = get_page(from_index + n_retrieved, this_page_size)
+            instances = response.data or []
+            yield from instances
+            n_retrieved += len(instances)
+            if len(instances) < this_page_size or (
+                response.total is not None and from_index + n_retrieved >= response.total
+            ):
+                break
 
     @classmethod
     def count(
@@ -412,6 +928,15 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             else:
                 api = "core"
         if api == "query":
+            filter_chunks = split_filter(filters, FILTER_CHUNK_SIZE)
+            if len(filter_chunks) > 1:
+                # the results of the sub-queries may overlap, so we retrieve their ids to count them
+
+                def make_query(chunk):
+                    return cls.generate_query(space=space, client=client, filters=chunk, property_names=[])
+
+                instances = cls._iter_query_instances(client, make_query, filters, 0, None, 1000, scope)
+                return sum(1 for instance in instances)
             query = cls.generate_query(space=space, client=client, filters=filters)
             response = client.query(query=query, from_index=0, size=1, scope=scope)
         elif api == "core":
@@ -420,6 +945,130 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             response = client.list(cls.type_, space=space, scope=scope, from_index=0, size=1)
         return response.total
 
+    @classmethod
+    def load_reverse(
+        cls,
+        objects: List[KGObject],
+        property_name: str,
+        client: KGClient,
+        scope: str = "released",
+        space: Optional[str] = None,
+    ) -> List[KGObject]:
+        """
+        Retrieve the values of a reverse property for many objects at once.
+
+        Rather than resolving the reverse property separately for each object,
+        this performs a single query (or a few, for very long lists of objects)
+        filtered by the ids of all the objects, and assigns the results back to each object.
+
+        Args:
+            objects (list of KGObject): The objects whose reverse property should be loaded.
+                These should be instances of this class, with ids.
+            property_name (str): The name of the reverse property, e.g. "is_version_of".
+            client: KGClient object that handles the communication with the KG.
+            scope (str, optional): The scope to use for the query. Can be 'released', 'in progress', or 'any'.
+                Default is 'released'.
+            space (str, optional): The KG space to be queried. If not specified, results from all accessible spaces will be included.
+
+        Returns:
+            A list of all the objects that were retrieved, each appearing once.
+
+        Example:
+
+            >>> import fairgraph.openminds.core as omcore
+            >>> dataset_versions = omcore.DatasetVersion.list(client, size=1000)
+            >>> omcore.DatasetVersion.load_reverse(dataset_versions, "is_version_of", client)
+            >>> dataset_versions[0].is_version_of
+            Dataset(...)
+        """
+        try:
+            prop = cls._property_lookup[property_name]
+        except KeyError:
+            raise ValueError(f"{cls.__name__} does not have a property named '{property_name}'")
+        if not prop.reverse:
+            raise ValueError(f"'{property_name}' is not a reverse property")
+
+        objects_by_id = {obj.id: obj for obj in objects if obj.id}
+        related: Dict[str, Dict[str, KGObject]] = {id: {} for id in objects_by_id}
+        retrieved: Dict[str, KGObject] = {}
+        for target_cls in prop.types:
+            for reverse_name in as_list(prop.reverse):
+                if reverse_name not in target_cls.property_names:
+                    continue
+                filters = {reverse_name: list(objects_by_id)}
+                for target in target_cls.iterate(
+                    client, api="query", scope=scope, space=space, page_size=1000, **filters
+                ):
+                    target = retrieved.setdefault(target.id, target)
+                    for linked in as_list(getattr(target, reverse_name)):
+                        linked_id = getattr(linked, "id", None)
+                        if linked_id in related:
+                            related[linked_id][target.id] = target
+
+        for id, obj in objects_by_id.items():
+            values = list(related[id].values())
+            if len(values) == 0:
+                setattr(obj, prop.name, None)
+            elif prop.multiple:
+                setattr(obj, prop.name, values)
+            elif len(values) == 1:
+                setattr(obj, prop.name, values[0])
+            else:
+                errmsg = f"Single item expected for prop {prop.name} of {obj.id} but found {len(values)}"
+                ErrorHandling.handle_violation(prop.error_handling, errmsg)
+                setattr(obj, prop.name, values)
+        return list(retrieved.values())
+
+    @classmethod
+    def load_links(
+        cls,
+        objects: List[KGObject],
+        property_names: List[str],
+        client: KGClient,
+        scope: str = "released",
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Retrieve the objects linked from many objects at once, for the given properties.
+
+        For each (forward) property, the links from all the objects are collected
+        and the linked objects retrieved in bulk, with a single request per class where possible,
+        then put in place of the KGProxy objects. Linked objects that appear several times are shared.
+        Reverse properties are loaded using :meth:`load_reverse`.
+
+        Args:
+            objects (list of KGObject): The objects whose links should be loaded.
+                These should be instances of this class.
+            property_names (list of str): The names of the link properties, e.g. ["authors", "license"].
+            client: KGClient object that handles the communication with the KG.
+            scope (str, optional): The scope to use. Can be 'released', 'in progress', or 'any'. Default is 'released'.
+            max_workers (int, optional): The maximum number of requests to the KG to run concurrently.
+
+        Example:
+
+            >>> import fairgraph.openminds.core as omcore
+            >>> dataset_versions = omcore.DatasetVersion.list(client, size=1000)
+            >>> omcore.DatasetVersion.load_links(dataset_versions, ["license", "accessibility"], client)
+            >>> dataset_versions[0].license
+            License(...)
+        """
+        follow_links: Dict[str, Any] = {}
+        for property_name in property_names:
+            try:
+                prop = cls._property_lookup[property_name]
+            except KeyError:
+                raise ValueError(f"{cls.__name__} does not have a property named '{property_name}'")
+            if not prop.is_link:
+                raise ValueError(f"'{property_name}' is not a link to other objects")
+            if prop.reverse:
+                cls.load_reverse(objects, prop.name, client, scope=scope)
+            else:
+                follow_links[prop.name] = {}
+        if follow_links:
+            _resolve_breadth_first(
+                [(obj, scope, follow_links) for obj in objects], client, max_workers=max_workers
+            )
+
     def _update_empty_properties(self, data: JSONdict, client: KGClient):
         """Replace any empty properties (value None) with the supplied data"""
         cls = self.__class__
@@ -728,6 +1377,7 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             name (str): a string to search for in the name property.
             client: a KGClient
             match (str, optional): either "equals" (exact match - default) or "contains".
+                Any other lookup, e.g. "startswith", may also be used.
             all (bool, optional): Whether to return all objects that match the name, or only the first. Defaults to False.
             space (str, optional): the KG space to search in. Default is to search in all available spaces.
             scope (str, optional): The scope of the search. Valid values are "released", "in progress", or "any".
@@ -738,8 +1388,15 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
         # todo: move this to openminds generation, and include only in those subclasses
         # that have a name
         # todo: also count 'lookup_name', "family_name", "given_name" as a name
-        objects = cls.list(client, space=space, scope=scope, api="query", name=name, follow_links=follow_links)
+        lookup = "exact" if match == "equals" else match
+        if lookup not in FILTER_LOOKUPS:
+            raise ValueError(f"Invalid value for 'match': {match}")
+        objects = cls.list(
+            client, space=space, scope=scope, api="query", follow_links=follow_links, **{f"name__{lookup}": name}
+        )
         if match == "equals":
+            # the filter value may have been truncated to work around a KG bug
+            # (see Property.get_lookup_filter()), so we double-check
             objects = [obj for obj in objects if hasattr(obj, "name") and obj.name == name]
         if len(objects) == 0:
             return None
@@ -787,6 +1444,8 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
         filters: Optional[Dict[str, Any]] = None,
         follow_links: Optional[Dict[str, Any]] = None,
         label: Optional[str] = None,
+        order_by: Optional[str] = None,
+        property_names: Optional[Union[List[str], Dict[str, Any]]] = None,
     ) -> Union[Dict[str, Any], None]:
         """
         Generate a KG query definition as a JSON-LD document.
@@ -797,6 +1456,12 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             filters (dict): A dictonary defining search parameters for the query.
             follow_links (dict): The links in the graph to follow. Defaults to None.
             label (str, optional): a label for the query
+            order_by (str, optional): the name of the property to sort by. If not specified,
+                results are sorted by name. Note that the query always sorts in ascending order,
+                even if the name is prefixed with "-".
+            property_names (list of str or dict, optional): if provided, only these properties
+                (and any needed for sorting) are included in the results. A dict can also select
+                the properties of linked objects, see :meth:`generate_query_properties()`.
 
         Returns:
             A JSON-LD document containing the KG query definition.
@@ -811,19 +1476,32 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
             normalized_filters = cls.normalize_filter(expand_filter(filters))
         else:
             normalized_filters = None
+        if property_names is not None and order_by:
+            sort_name = cls._parse_order_by(order_by)[0].name
+            if isinstance(property_names, dict):
+                property_names = {sort_name: None, **property_names}
+            else:
+                property_names = [*property_names, sort_name]
         # first pass, we build the basic structure
         query = Query(
             node_type=cls.type_,
             label=label,
             space=real_space,
-            properties=cls.generate_query_properties(follow_links),
+            properties=cls.generate_query_properties(follow_links, property_names=property_names),
         )
         # second pass, we add filters
         query.properties.extend(cls.generate_query_filter_properties(normalized_filters))
         # third pass, we add sorting, which can only happen at the top level
-        for prop in query.properties:
-            if prop.name in ("vocab:name", "vocab:fullName", "vocab:lookupLabel"):
-                prop.sorted = True
+        if order_by:
+            sort_property, _ = cls._parse_order_by(order_by)
+            sort_names: Tuple[str, ...] = (sort_property.path,)
+        else:
+            sort_names = ("vocab:name", "vocab:fullName", "vocab:lookupLabel")
+        for i, prop in enumerate(query.properties):
+            if prop.name in sort_names:
+                # query properties may be frozen and shared with other queries, so we modify a copy
+                query.properties[i] = prop.copy()
+                query.properties[i].sorted = True
         # implementation note: the three-pass approach generates queries that are sometimes more verbose
         #                      than necessary, but it makes the logic easier to understand.
         return query.serialize()
@@ -845,6 +1523,77 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
                         all_children.extend(child.children(client))
         return all_children
 
+    def traverse(
+        self,
+        client: KGClient,
+        max_depth: Optional[int] = None,
+        follow: Optional[Callable[[Property, type], bool]] = None,
+        batch: bool = True,
+        scope: Optional[str] = None,
+        use_cache: bool = True,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[Tuple[Tuple[str, ...], RepresentsSingleObject]]:
+        """
+        Iterate over the objects linked, directly or indirectly, from this one.
+
+        The graph is explored breadth-first, and each object is visited only once,
+        even if there are several paths to it or the graph contains cycles.
+        Links within embedded metadata (e.g. a person's affiliations) are also followed.
+
+        Args:
+            client: a KGClient
+            max_depth (int, optional): The maximum number of links between this object and
+                the objects returned. By default, there is no limit.
+            follow (callable, optional): A function which, given a link property and the class
+                of the object it belongs to, returns whether that link should be followed.
+                By default, all links are followed.
+            batch (bool): If True (the default), all the objects at a given depth are retrieved
+                together, before any of them are returned. If False, each object is retrieved
+                just before it is returned, which may be preferable if you only need the first few.
+            scope (str, optional): The scope of the lookup. Valid values are "released", "in progress", or "any".
+                If not provided, the scope of this object is used.
+            use_cache (bool): Whether to use cached data if they exist. Defaults to True.
+            max_workers (int, optional): The maximum number of requests to the KG to run concurrently.
+
+        Yields:
+            tuples of (path, object), where `path` is a tuple containing the names of the properties
+            linking this object to `object`. Objects are resolved, apart from those at `max_depth`,
+            which may be KGProxy instances, and those which could not be resolved.
+
+        Example:
+            >>> for path, obj in dataset_version.traverse(client, max_depth=2):
+            ...     print(".".join(path), obj)
+        """
+        from .kgproxy import resolve_many
+
+        scope = scope or self.scope
+        seen = {self.id or id(self)}
+        level: List[Tuple[Tuple[str, ...], ContainsMetadata]] = [((), self)]
+        depth = 0
+        while level and (max_depth is None or depth < max_depth):
+            depth += 1
+            found = []
+            for path, obj in level:
+                for sub_path, node in _linked_nodes(obj, follow):
+                    key = node.id or id(node)
+                    if key not in seen:
+                        seen.add(key)
+                        found.append((path + sub_path, node))
+            expand = max_depth is None or depth < max_depth
+            level = []
+            for chunk in [found] if batch else [[item] for item in found]:
+                nodes = [node for path, node in chunk]
+                if expand:
+                    # only objects which will be expanded need to be retrieved
+                    nodes = resolve_many(nodes, client, scope=scope, use_cache=use_cache, max_workers=max_workers)
+                for (path, node), obj in zip(chunk, nodes):
+                    if isinstance(obj, ResolutionFailure):
+                        logger.warning(str(obj))
+                        obj = node
+                    elif expand:
+                        level.append((path, obj))
+                    yield path, obj
+
     def export(self, path: str, single_file: bool = False):
         """
         Export metadata as files in JSON-LD format.
@@ -858,3 +1607,29 @@ class KGObject(ContainsMetadata, RepresentsSingleObject, SupportsQuerying):
         with extension ".jsonld". This file will contain metadata for all objects.
         """
         raise NotImplementedError("todo")
+
+
+def _linked_nodes(
+    obj: ContainsMetadata, follow: Optional[Callable[[Property, type], bool]] = None
+) -> Iterator[Tuple[Tuple[str, ...], RepresentsSingleObject]]:
+    """
+    Yield (path, node) for each KGObject or KGProxy linked directly from `obj`,
+    looking inside any embedded metadata.
+    """
+    for prop in obj.__class__.properties:
+        if prop.is_link and (follow is None or follow(prop, obj.__class__)):
+            for value in as_list(getattr(obj, prop.name)):
+                if isinstance(value, RepresentsSingleObject):
+                    yield (prop.name,), value
+                elif isinstance(value, ContainsMetadata):
+                    for sub_path, node in _linked_nodes(value, follow):
+                        yield (prop.name, *sub_path), node
+
+
+def _count_values(value: Any) -> int:
+    """Return the number of values in a cell of a table from KGObject.list_table(), looking inside nested lists."""
+    if value is None:
+        return 0
+    if isinstance(value, list):
+        return sum(_count_values(item) for item in value)
+    return 1
@@ -19,13 +19,19 @@ have not been retrieved from the KG.
 # limitations under the License.
 
 from __future__ import annotations
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 import logging
-from typing import List, Optional, Tuple, Union, Dict, Any, TYPE_CHECKING
+import sys
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple, Union, Dict, Any, TYPE_CHECKING
 
-from .registry import lookup
-from .errors import ResolutionFailure
-from .caching import object_cache
-from .base import RepresentsSingleObject
+from .registry import lookup, lookup_type
+from .errors import DeadlineExceeded, ResolutionFailure
+from .caching import object_cache, cache_lock
+from .base import RepresentsSingleObject, ContainsMetadata, _resolve_breadth_first
+from .utility import as_list, chunked, deadline, parallel_map
 
 if TYPE_CHECKING:
     from .client import KGClient
@@ -34,6 +40,12 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("fairgraph")
 
+# maximum number of instances to retrieve in a single request in resolve_many()
+MAX_INSTANCES_PER_REQUEST = 100
+
+# the batches of proxy resolutions which are active in the current context (see batching())
+_active_batches: ContextVar[Tuple[ResolutionBatch, ...]] = ContextVar("active_batches", default=())
+
 
 class KGProxy(RepresentsSingleObject):
     """
@@ -59,6 +71,9 @@ class KGProxy(RepresentsSingleObject):
 
     # todo: rename uri to id, for consistency?
 
+    # large numbers of proxies may be created, so we avoid having a per-instance __dict__
+    __slots__ = ("cls", "id", "preferred_scope", "remote_data")
+
     def __init__(self, cls: Union[str, KGObject], uri: str, preferred_scope: str = "released"):
         self.cls: KGObject
         if isinstance(cls, str):
@@ -71,6 +86,8 @@ class KGProxy(RepresentsSingleObject):
         if TYPE_CHECKING:
             assert isinstance(self.cls, KGObject)
         self.id = uri
+        if preferred_scope is not None:
+            preferred_scope = sys.intern(preferred_scope)
         self.preferred_scope = preferred_scope
         self.remote_data = None
 
@@ -102,6 +119,8 @@ class KGProxy(RepresentsSingleObject):
         scope: Optional[str] = None,
         use_cache: bool = True,
         follow_links: Optional[Dict[str, Any]] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
     ):
         """
         Retrieve the full metadata for the KGObject represented by this proxy.
@@ -112,32 +131,33 @@ class KGProxy(RepresentsSingleObject):
                 If not provided, the "preferred_scope" provided when creating the proxy object will be used.
             use_cache (bool): Whether to use cached data if they exist. Defaults to True.
             follow_links (dict): The links in the graph to follow. Defaults to None.
+            max_workers (int, optional): The maximum number of requests to the KG to run concurrently
+                when following links. If not provided, `fairgraph.kgobject.MAX_CONCURRENT_QUERIES` is used.
+            timeout (float, optional): The maximum time, in seconds, for the whole operation.
+                If exceeded, DeadlineExceeded is raised. See also :func:`fairgraph.utility.deadline`.
 
         Returns:
             a KGObject instance, of the appropriate subclass.
         """
-        if use_cache and self.id in object_cache:
-            obj = object_cache[self.id]
-        else:
-            scope = scope or self.preferred_scope
-            if len(self.classes) > 1:
-                obj = None
-                for cls in self.classes:
-                    try:
-                        obj = cls.from_uri(self.id, client, scope=scope)
-                    except TypeError:
-                        pass
-                    else:
-                        break
+        with deadline(timeout):
+            if use_cache and self.id in object_cache:
+                obj = object_cache[self.id]
+            elif _get_batch(client) is not None:
+                return _get_batch(client).add(self, scope, use_cache, follow_links)
             else:
-                obj = self.cls.from_uri(self.id, client, scope=scope)
-            if obj is None:
-                raise ResolutionFailure(f"Cannot resolve proxy object of type {self.cls} with id {self.uuid}")
-            object_cache[self.id] = obj
-        if follow_links:
-            return obj.resolve(client, scope=scope, use_cache=use_cache, follow_links=follow_links)
-        else:
-            return obj
+                scope = scope or self.preferred_scope
+                # the data are retrieved once, then the class is chosen from the type, if necessary
+                data = client.instance_from_full_uri(self.id, use_cache=use_cache, scope=scope)
+                obj = _build_object(data, self.id, tuple(self.classes), client, scope)
+                if isinstance(obj, ResolutionFailure):
+                    raise obj
+                object_cache[self.id] = obj
+            if follow_links:
+                return obj.resolve(
+                    client, scope=scope, use_cache=use_cache, follow_links=follow_links, max_workers=max_workers
+                )
+            else:
+                return obj
 
     def __repr__(self):
         return "{self.__class__.__name__}(" "{self.classes!r}, {self.id!r})".format(self=self)
@@ -167,3 +187,290 @@ class KGProxy(RepresentsSingleObject):
             obj.delete(client, ignore_not_found=ignore_not_found)
         elif not ignore_not_found:
             raise ResolutionFailure("Couldn't resolve object to delete")
+
+
+class DeferredObject:
+    """
+    Placeholder for a KGObject whose retrieval has been deferred, returned by
+    :meth:`KGProxy.resolve()` when used within :func:`batching()`.
+
+    Accessing any attribute of the placeholder triggers the retrieval of all the pending
+    objects in the batch, after which the placeholder behaves like the KGObject.
+    To obtain the KGObject itself, e.g. for use with `isinstance()`, call :meth:`result()`.
+    """
+
+    __slots__ = ("_batch", "_proxy", "_scope", "_use_cache", "_follow_links", "_result", "_ready")
+
+    def __init__(
+        self,
+        batch: ResolutionBatch,
+        proxy: KGProxy,
+        scope: Optional[str],
+        use_cache: bool,
+        follow_links: Optional[Dict[str, Any]],
+    ):
+        object.__setattr__(self, "_batch", batch)
+        object.__setattr__(self, "_proxy", proxy)
+        object.__setattr__(self, "_scope", scope)
+        object.__setattr__(self, "_use_cache", use_cache)
+        object.__setattr__(self, "_follow_links", follow_links)
+        object.__setattr__(self, "_result", None)
+        object.__setattr__(self, "_ready", threading.Event())
+
+    def result(self) -> KGObject:
+        """
+        Return the KGObject, retrieving it (together with the other pending objects) if necessary.
+
+        Raises:
+            ResolutionFailure: if the object could not be retrieved.
+        """
+        if not self._ready.is_set():
+            self._batch.flush()
+            # the object may be being retrieved by a flush in another thread
+            self._ready.wait()
+        if isinstance(self._result, ResolutionFailure):
+            raise self._result
+        return self._result
+
+    def __getattr__(self, name):
+        return getattr(self.result(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.result(), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, DeferredObject):
+            other = other.result()
+        return self.result() == other
+
+    def __repr__(self):
+        if self._result is None:
+            return f"{self.__class__.__name__}({self._proxy!r})"
+        return repr(self._result)
+
+
+class ResolutionBatch:
+    """
+    A collection of proxy resolutions for a given client, which are
+    carried out together, using :func:`resolve_many()`, when first needed.
+    """
+
+    def __init__(self, client: KGClient, max_workers: Optional[int] = None):
+        self.client = client
+        self.max_workers = max_workers
+        self.pending: List[DeferredObject] = []
+        self.lock = threading.Lock()
+
+    def add(
+        self,
+        proxy: KGProxy,
+        scope: Optional[str] = None,
+        use_cache: bool = True,
+        follow_links: Optional[Dict[str, Any]] = None,
+    ) -> DeferredObject:
+        """Add a proxy to the batch, and return a placeholder for the resolved object."""
+        deferred = DeferredObject(self, proxy, scope, use_cache, follow_links)
+        with self.lock:
+            self.pending.append(deferred)
+        return deferred
+
+    def flush(self):
+        """Resolve all the pending proxies."""
+        # the lock only protects the list of pending objects: other threads wait for the objects themselves
+        with self.lock:
+            pending, self.pending = self.pending, []
+        # resolutions with different options are carried out separately
+        groups: Dict[Tuple[Optional[str], bool, str], List[DeferredObject]] = defaultdict(list)
+        for deferred in pending:
+            groups[(deferred._scope, deferred._use_cache, str(deferred._follow_links))].append(deferred)
+        try:
+            # proxies resolved while carrying out the batch, including in worker threads, are resolved directly
+            with _batching_disabled():
+                for group in groups.values():
+                    results = resolve_many(
+                        [deferred._proxy for deferred in group],
+                        self.client,
+                        scope=group[0]._scope,
+                        use_cache=group[0]._use_cache,
+                        follow_links=group[0]._follow_links,
+                        max_workers=self.max_workers,
+                    )
+                    for deferred, result in zip(group, results):
+                        object.__setattr__(deferred, "_result", result)
+                        deferred._ready.set()
+        finally:
+            # if retrieval failed, don't leave other threads waiting
+            for deferred in pending:
+                if not deferred._ready.is_set():
+                    object.__setattr__(
+                        deferred, "_result", ResolutionFailure(f"Unable to retrieve {deferred._proxy.id}")
+                    )
+                    deferred._ready.set()
+
+
+def _get_batch(client: KGClient) -> Optional[ResolutionBatch]:
+    """Return the innermost active batch for the given client, if any."""
+    for batch in reversed(_active_batches.get()):
+        if batch.client is client:
+            return batch
+    return None
+
+
+@contextmanager
+def _batching_disabled() -> Iterator[None]:
+    """Context manager within which proxies are resolved immediately, even within :func:`batching()`."""
+    token = _active_batches.set(())
+    try:
+        yield
+    finally:
+        _active_batches.reset(token)
+
+
+def unwrap_deferred(value: Any) -> Any:
+    """Replace any DeferredObject in `value` (which may be a list) by the object it stands for."""
+    if isinstance(value, DeferredObject):
+        return value.result()
+    elif isinstance(value, (list, tuple)) and any(isinstance(item, DeferredObject) for item in value):
+        return value.__class__(unwrap_deferred(item) for item in value)
+    return value
+
+
+@contextmanager
+def batching(client: KGClient, max_workers: Optional[int] = None) -> Iterator[ResolutionBatch]:
+    """
+    Context manager within which :meth:`KGProxy.resolve()` defers retrieval of objects.
+
+    Within the block, resolving a proxy (that is not already cached) returns a :class:`DeferredObject`.
+    All the deferred objects are retrieved together, using :func:`resolve_many()`, as soon as
+    any of them is used, or at the end of the block. This avoids making one request per object,
+    when resolving links in a loop, without having to restructure the loop. Normally used as
+    :meth:`KGClient.batching()`.
+
+    Example:
+        >>> with client.batching():
+        ...     licenses = [dataset.license.resolve(client) for dataset in datasets]
+        >>> licenses[0].name  # all licenses were retrieved with a single request
+    """
+    batch = ResolutionBatch(client, max_workers=max_workers)
+    token = _active_batches.set(_active_batches.get() + (batch,))
+    try:
+        yield batch
+    finally:
+        _active_batches.reset(token)
+    # if the block raised an exception, the pending objects are only retrieved if they are used
+    batch.flush()
+
+
+def resolve_many(
+    proxies: Iterable[Union[KGProxy, KGObject]],
+    client: KGClient,
+    scope: Optional[str] = None,
+    use_cache: bool = True,
+    follow_links: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Union[KGObject, ResolutionFailure]]:
+    """
+    Retrieve the full metadata for a collection of KGProxy objects.
+
+    Proxies are grouped by class and scope, and the instances not already present in
+    the object cache are retrieved in bulk, with several requests running in parallel.
+    This is generally much faster than calling :meth:`KGProxy.resolve()` for each proxy.
+
+    Args:
+        proxies: the proxies to resolve. Any items that are not proxies are returned as they are,
+            after following their links if `follow_links` is given. This means this function
+            can also be used to follow links from a list of KGObjects, e.g. as returned by `list()`.
+        client: a KGClient
+        scope (str, optional): The scope of the lookup. Valid values are "released", "in progress", or "any".
+            If not provided, the "preferred_scope" of each proxy will be used.
+        use_cache (bool): Whether to use cached data if they exist. Defaults to True.
+        follow_links (dict): The links in the graph to follow. Defaults to None.
+        max_workers (int, optional): The maximum number of requests to the KG to run concurrently.
+            If not provided, `fairgraph.kgobject.MAX_CONCURRENT_QUERIES` is used.
+            Use 1 to make requests one at a time.
+        timeout (float, optional): The maximum time, in seconds, for the whole operation.
+            If exceeded, DeadlineExceeded is raised, with the list of results so far
+            (containing the proxies that were not yet resolved) as `partial_results`.
+
+    Returns:
+        a list containing, for each of the input proxies and in the same order, either
+        a KGObject instance or, if that proxy could not be resolved, a ResolutionFailure.
+    """
+    if max_workers is None:
+        from .kgobject import MAX_CONCURRENT_QUERIES as max_workers
+
+    items = list(proxies)
+    results: List[Any] = list(items)
+    # group by (scope, classes), then by id, as the same proxy may appear more than once
+    groups: Dict[Tuple[str, Tuple[KGObject, ...]], Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+    for i, item in enumerate(items):
+        if not isinstance(item, KGProxy):
+            continue
+        if use_cache and item.id in object_cache:
+            results[i] = object_cache[item.id]
+        else:
+            groups[(scope or item.preferred_scope, tuple(item.classes))][item.id].append(i)
+
+    try:
+        with deadline(timeout):
+            requests = [
+                (group_scope, classes, uris)
+                for (group_scope, classes), positions in groups.items()
+                for uris in chunked(list(positions), MAX_INSTANCES_PER_REQUEST)
+            ]
+
+            def _fetch(request):
+                group_scope, classes, uris = request
+                return client.instances_from_full_uris(uris, use_cache=use_cache, scope=group_scope)
+
+            for (group_scope, classes, uris), instances in zip(
+                requests, parallel_map(_fetch, requests, max_workers=max_workers)
+            ):
+                positions = groups[(group_scope, classes)]
+                objects = {uri: _build_object(instances.get(uri), uri, classes, client, group_scope) for uri in uris}
+                with cache_lock:
+                    for uri, obj in objects.items():
+                        if not isinstance(obj, ResolutionFailure):
+                            object_cache[uri] = obj
+                        for i in positions[uri]:
+                            results[i] = obj
+
+            if follow_links:
+                # the links from all the objects are followed together, level by level
+                level = [
+                    (obj, scope or getattr(item, "preferred_scope", None), follow_links)
+                    for item, obj in zip(items, results)
+                    if isinstance(obj, ContainsMetadata)
+                ]
+                _resolve_breadth_first(level, client, use_cache=use_cache, max_workers=max_workers)
+    except DeadlineExceeded as err:
+        err.partial_results = results
+        raise
+    return results
+
+
+def _build_object(
+    data: Optional[Dict[str, Any]], uri: str, classes: Tuple[KGObject, ...], client: KGClient, scope: str
+) -> Union[KGObject, ResolutionFailure]:
+    """Create a KGObject from the data returned for a proxy, or a ResolutionFailure if this isn't possible."""
+    if not data:
+        return ResolutionFailure(f"Cannot resolve proxy object of type {list(classes)} with id {uri}")
+    if len(classes) == 1:
+        cls = classes[0]
+    else:
+        try:
+            # several classes may be registered for the same type
+            candidates = as_list(lookup_type(data["@type"]))
+        except KeyError:
+            candidates = []
+        matches = [cls for cls in candidates if cls in classes]
+        if not matches:
+            return ResolutionFailure(
+                f"Instance {uri} has type {data.get('@type')}, which does not match any of {list(classes)}"
+            )
+        cls = matches[0]
+    try:
+        return cls.from_kg_instance(data, client, scope=scope)
+    except TypeError as err:
+        return ResolutionFailure(f"Cannot resolve proxy object of type {list(classes)} with id {uri}: {err}")
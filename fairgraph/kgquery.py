@@ -22,10 +22,10 @@ from __future__ import annotations
 import logging
 from typing import Dict, List, Optional, Union, Any, TYPE_CHECKING
 
-from .utility import as_list, expand_filter
+from .utility import as_list, deadline, expand_filter, parallel_map
 from .registry import lookup
-from .caching import object_cache
-from .base import Resolvable, SupportsQuerying, ContainsMetadata
+from .caching import object_cache, cache_lock, identity_map, identity_scope
+from .base import Resolvable, SupportsQuerying, ContainsMetadata, JSONdict, _resolve_breadth_first
 
 if TYPE_CHECKING:
     from .client import KGClient
@@ -87,6 +87,9 @@ class KGQuery(Resolvable, SupportsQuerying):
         scope: Optional[str] = None,
         use_cache: bool = True,
         follow_links: Optional[Dict[str, Any]] = None,
+        raw: bool = False,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
     ):
         """
         Retrieve the full metadata for the KGObject(s) represented by this query object.
@@ -100,32 +103,61 @@ class KGQuery(Resolvable, SupportsQuerying):
                 If not provided, the "preferred_scope" provided when creating the proxy object will be used.
             use_cache (bool): Whether to use cached data if they exist. Defaults to True.
             follow_links (dict): The links in the graph to follow. Defaults to None.
+            raw (bool): If True, return normalized JSON-LD documents (with expanded keys)
+                rather than KGObject instances. These are not cached. Defaults to False.
+            max_workers (int, optional): The maximum number of requests to the KG to run concurrently,
+                when the query covers several classes or when following links.
+                If not provided, `fairgraph.kgobject.MAX_CONCURRENT_QUERIES` is used.
+            timeout (float, optional): The maximum time, in seconds, for the whole operation.
+                If exceeded, DeadlineExceeded is raised. See also :func:`fairgraph.utility.deadline`.
 
         Returns:
             a KGObject instance, of the appropriate subclass.
         """
+        if max_workers is None:
+            from .kgobject import MAX_CONCURRENT_QUERIES as max_workers
         scope = scope or self.preferred_scope
-        objects: List[KGObject] = []
-        for cls in self.classes:
-            query = cls.generate_query(client=client, filters=self.filter, space=space, follow_links=follow_links)
-            instances = client.query(
-                query=query,
-                size=size,
-                from_index=from_index,
-                scope=scope,
-            ).data
-            objects.extend(cls.from_kg_instance(instance_data, client) for instance_data in instances)
-        for obj in objects:
-            object_cache[obj.id] = obj
-
-        if follow_links:
-            for obj in objects:
-                obj.resolve(client, scope=scope, use_cache=use_cache, follow_links=follow_links)
-
-        if len(objects) == 1:
-            return objects[0]
-        else:
-            return objects
+        with deadline(timeout):
+            objects: List[KGObject] = []
+            documents: List[JSONdict] = []
+
+            def _query(cls):
+                query = cls.generate_query(client=client, filters=self.filter, space=space, follow_links=follow_links)
+                return client.query(
+                    query=query,
+                    size=size,
+                    from_index=from_index,
+                    scope=scope,
+                ).data
+
+            for cls, instances in zip(self.classes, parallel_map(_query, self.classes, max_workers=max_workers)):
+                if raw:
+                    documents.extend(cls._normalize_raw_document(instance_data) for instance_data in instances)
+                else:
+                    # linked nodes that appear several times in the response are deserialized only once
+                    with identity_map(), identity_scope(scope):
+                        objects.extend(cls.from_kg_instance(instance_data, client) for instance_data in instances)
+            if raw:
+                if len(documents) == 1:
+                    return documents[0]
+                else:
+                    return documents
+            with cache_lock:
+                for obj in objects:
+                    object_cache[obj.id] = obj
+
+            if follow_links:
+                _resolve_breadth_first(
+                    [(obj, scope, follow_links) for obj in objects],
+                    client,
+                    use_cache=use_cache,
+                    max_workers=max_workers,
+                )
+
+            if len(objects) == 1:
+                return objects[0]
+            else:
+                return objects
 
     def count(self, client: KGClient, space: Optional[str] = None, scope: Optional[str] = None):
         """
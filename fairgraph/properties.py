@@ -20,6 +20,7 @@ from __future__ import annotations
 import logging
 from datetime import date, datetime
 from collections.abc import Iterable, Mapping
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING, Union
 from uuid import UUID
 from warnings import warn
@@ -31,13 +32,14 @@ from dateutil import parser as date_parser
 
 from .registry import lookup, lookup_type
 from .utility import as_list
-from .base import IRI, JSONdict, ContainsMetadata, ErrorHandling
-from .kgproxy import KGProxy
+from .base import IRI, JSONdict, ContainsMetadata, ErrorHandling, SerializationContext
+from .kgproxy import KGProxy, DeferredObject, _batching_disabled, unwrap_deferred
 from .kgquery import KGQuery
 from .kgobject import KGObject
 from .embedded import EmbeddedMetadata
-from .utility import expand_uri
-from .queries import Filter, QueryProperty
+from .utility import expand_uri, intern_uri
+from .queries import Filter, QueryProperty, FILTER_LOOKUPS
+from .caching import get_identity_map
 
 
 logger = logging.getLogger("fairgraph")
@@ -48,10 +50,81 @@ global_context = {
 }
 
 
+def _hashable(follow_links: Optional[Dict[str, Any]]) -> Any:
+    """Convert a (nested) follow_links dict into a form that can be used as a dict key"""
+    if follow_links is None:
+        return None
+    return tuple(sorted((key, _hashable(value)) for key, value in follow_links.items()))
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_datetime(value: str) -> Optional[datetime]:
+    if len(value) >= 10 and value[4] == "-":
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        # we leave time zones to dateutil, so that the tzinfo objects are the same as before
+        if parsed.tzinfo is None:
+            return parsed
+    return None
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse a date or date-time string.
+
+    Dates in the KG are almost always in ISO 8601 format, which can be parsed much
+    faster than the general formats handled by `dateutil`. Since many dates are
+    repeated (e.g. release dates), the results for ISO 8601 strings are cached.
+    """
+    return _parse_iso_datetime(value) or date_parser.parse(value)
+
+
+@lru_cache(maxsize=None)
+def _classes_by_type(classes: Tuple[ContainsMetadata, ...]) -> Dict[Tuple[str, ...], ContainsMetadata]:
+    """For a set of possible classes for a property, map the "@type" of each class to the class."""
+    return {(cls.type_,): cls for cls in reversed(classes)}
+
+
 def is_resolved(item: JSONdict) -> bool:
     return set(item.keys()) not in (set(["@id", "@type"]), set(["@id"]))
 
 
+def _count_expanded(data: Any) -> int:
+    """Return the number of expanded nodes (with more than just "@id" and "@type") in a JSON-LD structure."""
+    if isinstance(data, list):
+        return sum(_count_expanded(item) for item in data)
+    elif isinstance(data, dict):
+        return is_resolved(data) + sum(
+            _count_expanded(value) for key, value in data.items() if not key.startswith("@")
+        )
+    else:
+        return 0
+
+
+def _merge_expanded(obj: KGObject, item: JSONdict, client: Optional[KGClient]):
+    """
+    Update `obj`, taken from an identity map, with the linked nodes that are expanded
+    in `item`, another copy of the same node, but not in the data from which `obj` was built.
+
+    This happens when the same node appears at different depths, when following links.
+    """
+    if _count_expanded(item) <= _count_expanded(obj.__dict__.get("_raw_remote_data")):
+        return
+    more_expanded = obj.__class__.from_kg_instance(item, client)
+    for prop in obj.__class__.properties:
+        if prop.is_link:
+            current_value = getattr(obj, prop.name)
+            new_value = getattr(more_expanded, prop.name)
+            n_proxies = sum(isinstance(value, KGProxy) for value in as_list(current_value))
+            if (current_value is None and new_value is not None) or n_proxies > sum(
+                isinstance(value, KGProxy) for value in as_list(new_value)
+            ):
+                obj.__dict__[prop.name] = new_value
+    obj.__dict__["_raw_remote_data"] = item
+
+
 def build_kg_object(
     possible_classes: Iterable[Union[EmbeddedMetadata, KGObject]],
     data: Optional[Union[JSONdict, List[JSONdict]]],
@@ -92,10 +165,10 @@ def build_kg_object(
         )
         if len(possible_classes) > 1:
             if "@type" in item:
-                for cls in possible_classes:
-                    if item["@type"] == [cls.type_]:
-                        kg_cls = cls
-                        break
+                # if the type doesn't match any of the classes, we keep them all (see below)
+                kg_cls = _classes_by_type(tuple(possible_classes)).get(
+                    tuple(as_list(item["@type"])), possible_classes
+                )
             else:
                 kg_cls = possible_classes
 
@@ -105,14 +178,34 @@ def build_kg_object(
         if "@id" in item:
             # the following line is only relevant to test data,
             # for real data it is always an expanded uri
-            item["@id"] = expand_uri(item["@id"], {"kg": "https://kg.ebrains.eu/api/instances/"})
+            # ids of linked objects (e.g. controlled terms) are often repeated, so we keep a single copy
+            uri = intern_uri(expand_uri(item["@id"], {"kg": "https://kg.ebrains.eu/api/instances/"}))
+            if uri is not item["@id"]:
+                # we don't modify `data`, since it may belong to the caller
+                item = {**item, "@id": uri}
             if is_resolved(item):
+                shared_objects = get_identity_map(client)
                 try:
-                    obj = kg_cls.from_kg_instance(item, client)
+                    if shared_objects is None:
+                        obj = kg_cls.from_kg_instance(item, client)
+                    else:
+                        # each node is deserialized only once per response (or per client)
+                        obj = shared_objects.get(item["@id"])
+                        if obj is None:
+                            obj = kg_cls.from_kg_instance(item, client)
+                            # if another thread got there first, use its object
+                            obj = shared_objects.setdefault(item["@id"], obj)
+                        elif obj.__class__ not in as_list(kg_cls):
+                            obj = kg_cls.from_kg_instance(item, client)
+                            shared_objects[item["@id"]] = obj
+                        else:
+                            # the same node may appear elsewhere in the response with more links followed
+                            _merge_expanded(obj, item, client)
                 except (ValueError, KeyError) as err:
                     # to add: emit a warning
                     logger.warning("Error in building {}: {}".format(kg_cls.__name__, err))
-                    obj = KGProxy(kg_cls, item["@id"]).resolve(client)
+                    with _batching_disabled():
+                        obj = KGProxy(kg_cls, item["@id"]).resolve(client)
                     # todo: provide space and scope
             else:
                 if "@type" in item and item["@type"] is not None and kg_cls not in as_list(lookup_type(item["@type"][0])):
@@ -154,6 +247,20 @@ class Property(object):
     KGObjects and EmbeddedMetadata instances, and for de-serialization from JSON-LD into Python objects.
     """
 
+    __slots__ = (
+        "name",
+        "_types",
+        "_resolved_types",
+        "path",
+        "required",
+        "default",
+        "multiple",
+        "error_handling",
+        "reverse",
+        "doc",
+        "_query_properties_cache",
+    )
+
     def __init__(
         self,
         name: str,
@@ -188,6 +295,7 @@ class Property(object):
         self.error_handling = error_handling
         self.reverse = reverse
         self.doc = doc
+        self._query_properties_cache: Dict[Any, Tuple[QueryProperty, ...]] = {}
 
     def __repr__(self):
         return "Property(name='{}', types={}, path='{}', required={}, multiple={})".format(
@@ -201,8 +309,19 @@ class Property(object):
             self._resolved_types = True
         return self._types
 
-    def check_value(self, value):
+    def validate(self, value) -> List[str]:
+        """
+        Check whether a value is valid for this property.
+
+        Returns:
+            a list of error messages, which is empty if the value is valid.
+        """
+        errors = []
+
         def check_single(item):
+            if isinstance(item, DeferredObject):
+                # check the type without triggering retrieval
+                item = item._proxy
             if not isinstance(item, self.types):
                 if not (
                     isinstance(item, (KGProxy, KGQuery, EmbeddedMetadata))
@@ -212,7 +331,7 @@ class Property(object):
                         errmsg = "Property '{}' is required but was not provided.".format(self.name)
                     else:
                         errmsg = "Property '{}' should be of type {}, not {}".format(self.name, self.types, type(item))
-                    ErrorHandling.handle_violation(self.error_handling, errmsg)
+                    errors.append(errmsg)
 
         if self.required or value is not None:
             if self.multiple and isinstance(value, Iterable) and not isinstance(value, Mapping):
@@ -220,6 +339,11 @@ class Property(object):
                     check_single(item)
             else:
                 check_single(value)
+        return errors
+
+    def check_value(self, value):
+        for errmsg in self.validate(value):
+            ErrorHandling.handle_violation(self.error_handling, errmsg)
 
     @property
     def intrinsic(self):
@@ -237,7 +361,9 @@ class Property(object):
     def expanded_path(self) -> str:
         return expand_uri(self.path, global_context)
 
-    def serialize(self, value: Any, follow_links: bool = False):
+    def serialize(
+        self, value: Any, follow_links: bool = False, serialization_context: Optional[SerializationContext] = None
+    ):
         """
         Serialize a value to JSON-LD.
 
@@ -246,17 +372,23 @@ class Property(object):
             follow_links (bool): If the value contains graph links, these links
                 will be represented using "@id" (follow_links=False) or fully
                 serialized recursively (follow_links=True).
+            serialization_context (SerializationContext, optional): If provided, objects
+                which have already been serialized are represented using "@id".
         """
 
         def serialize_single(value):
             if isinstance(value, (str, int, float, dict)):
                 return value
             elif isinstance(value, EmbeddedMetadata):
+                if serialization_context:
+                    return serialization_context.serialize(value, follow_links=follow_links)
                 return value.to_jsonld(follow_links=follow_links)
             elif isinstance(value, IRI):
                 return value.to_jsonld()
             elif isinstance(value, KGObject):
                 if follow_links or value.id is None:
+                    if serialization_context:
+                        return serialization_context.serialize(value, follow_links=follow_links)
                     return value.to_jsonld(follow_links=follow_links)
                 else:
                     return {"@id": value.id}
@@ -269,6 +401,8 @@ class Property(object):
             else:
                 raise ValueError("don't know how to serialize this value")
 
+        # placeholders from batching() are serialized as the objects they stand for
+        value = unwrap_deferred(value)
         if isinstance(value, (list, tuple)):
             if self.multiple or self.error_handling != ErrorHandling.error:
                 value = [serialize_single(item) for item in value]
@@ -314,9 +448,9 @@ class Property(object):
                 if isinstance(data, str):
                     if data == "":  # seems like the KG Editor puts empty strings here rather than None?
                         return None
-                    return date_parser.parse(data)
+                    return parse_datetime(data)
                 elif isinstance(data, Iterable):
-                    return [date_parser.parse(item) for item in data]
+                    return [parse_datetime(item) for item in data]
                 else:
                     raise ValueError("expecting a string or list")
             elif self.types[0] == int:
@@ -358,12 +492,30 @@ class Property(object):
             property_name = property_name[1:]
         return property_name
 
-    def get_query_properties(self, follow_links: Optional[Dict[str, Any]] = None) -> List[QueryProperty]:
+    def get_query_properties(
+        self, follow_links: Optional[Dict[str, Any]] = None, property_names: Optional[Dict[str, Any]] = None
+    ) -> List[QueryProperty]:
         """
         Generate one or more QueryProperty instances for this property,
         for use in constructing a KG query definition.
+
+        If `property_names` is provided, only these properties of the linked objects
+        are included (see ContainsMetadata.generate_query_properties()). For links which
+        are not followed, an empty `property_names` means that only the ids are retrieved.
+
+        The QueryProperty instances are frozen and cached, so they may be shared
+        between queries. Use QueryProperty.copy() to obtain a version that can be modified.
         """
+        cache_key = (_hashable(follow_links), _hashable(property_names))
+        if cache_key not in self._query_properties_cache:
+            self._query_properties_cache[cache_key] = tuple(
+                prop.freeze() for prop in self._build_query_properties(follow_links, property_names)
+            )
+        return list(self._query_properties_cache[cache_key])
 
+    def _build_query_properties(
+        self, follow_links: Optional[Dict[str, Any]] = None, property_names: Optional[Dict[str, Any]] = None
+    ) -> List[QueryProperty]:
         properties = []
         if any(issubclass(_type, EmbeddedMetadata) for _type in self.types):
             if not all(issubclass(_type, EmbeddedMetadata) for _type in self.types):
@@ -387,7 +539,7 @@ class Property(object):
                         reverse=self.reverse,
                         type_filter=type_filter,
                         ensure_order=self.multiple,
-                        properties=cls.generate_query_properties(follow_links),
+                        properties=cls.generate_query_properties(follow_links, property_names=property_names),
                     )
                 )
         elif any(issubclass(_type, KGObject) for _type in self.types):
@@ -407,7 +559,10 @@ class Property(object):
                             reverse=self.reverse,
                             type_filter=type_filter,
                             ensure_order=self.multiple,
-                            properties=[QueryProperty("@id"), *cls.generate_query_properties(follow_links)],
+                            properties=[
+                                QueryProperty("@id"),
+                                *cls.generate_query_properties(follow_links, property_names=property_names),
+                            ],
                         )
                     )
             else:
@@ -416,6 +571,10 @@ class Property(object):
                     if property_name.startswith("^"):
                         assert self.reverse
                         property_name = property_name[1:]
+                    sub_properties = [QueryProperty("@id")]
+                    # an empty selection means that only the ids of the linked objects are needed
+                    if property_names is None or property_names:
+                        sub_properties.append(QueryProperty("@type"))
                     properties.append(
                         QueryProperty(
                             self.expanded_path,
@@ -423,10 +582,7 @@ class Property(object):
                             reverse=self.reverse,
                             type_filter=None,
                             ensure_order=self.multiple,
-                            properties=[
-                                QueryProperty("@id"),
-                                QueryProperty("@type"),
-                            ],
+                            properties=sub_properties,
                         )
                     )
                 else:
@@ -450,7 +606,10 @@ class Property(object):
         for use in constructing a KG query definition.
         """
         assert filter is not None
-        if isinstance(filter, dict):
+        if isinstance(filter, Filter):
+            # the filter operation was specified explicitly, see get_lookup_filter()
+            filter_obj = filter
+        elif isinstance(filter, dict):
             # we pass the filter through to the next level
             filter_obj = None
         else:
@@ -476,9 +635,45 @@ class Property(object):
                         prop.properties.extend(child_properties)
                         break
         else:
-            prop = QueryProperty(self.expanded_path, name=f"Q{self.name}", filter=filter_obj, required=True)
+            # with IS_EMPTY we are looking for instances that do not have this property
+            required = not (filter_obj and filter_obj.operation == "IS_EMPTY")
+            prop = QueryProperty(self.expanded_path, name=f"Q{self.name}", filter=filter_obj, required=required)
         return prop
 
+    def is_lookup(self, filter: Any) -> bool:
+        """
+        Return True if the filter specification is a lookup
+        (e.g. {"startswith": "Mouse"}, from the user filter ``name__startswith="Mouse"``),
+        rather than a filter on the properties of linked objects.
+        """
+        return isinstance(filter, dict) and len(filter) == 1 and next(iter(filter)) in FILTER_LOOKUPS
+
+    def get_lookup_filter(self, lookup: str, value: Any) -> Filter:
+        """
+        Generate a Filter for a lookup such as "exact" or "startswith", for use in a KG query.
+
+        Example:
+            >>> prop = Property("name", str, "vocab:name")
+            >>> prop.get_lookup_filter("startswith", "Mouse").serialize()
+            {'op': 'STARTS_WITH', 'value': 'Mouse'}
+        """
+        try:
+            operation = FILTER_LOOKUPS[lookup]
+        except KeyError:
+            raise ValueError(f"Unknown lookup '{lookup}'. Valid lookups are: {', '.join(FILTER_LOOKUPS)}")
+        if operation == "IS_EMPTY":
+            if value is not True:
+                raise ValueError(f"The only supported value for '{self.name}__{lookup}' is True")
+            return Filter(operation)
+        if operation == "REGEX":
+            # regular expressions are passed through unchanged
+            return Filter(operation, value=value)
+        filter_value = self.get_filter_value(value)
+        if operation == "EQUALS" and isinstance(value, str) and filter_value != value:
+            # the value was truncated to work around a KG bug, so can no longer match exactly
+            operation = "STARTS_WITH"
+        return Filter(operation, value=filter_value)
+
     def get_filter_value(self, value: Any) -> Union[str, List[str]]:
         """
         Normalize a value for use in a KG query
@@ -498,6 +693,8 @@ class Property(object):
                     val = UUID(val)
                 except ValueError:
                     pass
+            if isinstance(val, str) and val.startswith("http"):  # for @id
+                return True
             return isinstance(val, (IRI, UUID, *self.types)) or (isinstance(val, KGProxy) and val.cls in self.types)
 
         if isinstance(value, list) and len(value) > 0:
@@ -506,13 +703,8 @@ class Property(object):
         else:
             valid_type = is_valid(value)
             have_multiple = False
-        if not valid_type:
-            if self.name == "hash":  # bit of a hack
-                filter_value = value
-            elif isinstance(value, str) and value.startswith("http"):  # for @id
-                filter_value = value
-            else:
-                raise TypeError("{} must be of type {}, not {}".format(self.name, self.types, type(value)))
+        if not valid_type and self.name != "hash":  # bit of a hack
+            raise TypeError("{} must be of type {}, not {}".format(self.name, self.types, type(value)))
 
         filter_items = []
         for item in as_list(value):
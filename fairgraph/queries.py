@@ -20,6 +20,80 @@ from __future__ import annotations
 from typing import Optional, List, Any, Dict
 
 
+# Suffixes that can be appended to property names in filters, e.g. ``name__startswith="Mouse"``,
+# and the corresponding KG query filter operations.
+FILTER_LOOKUPS = {
+    "exact": "EQUALS",
+    "contains": "CONTAINS",
+    "startswith": "STARTS_WITH",
+    "endswith": "ENDS_WITH",
+    "regex": "REGEX",
+    "isempty": "IS_EMPTY",
+}
+
+
+def _copy_json(data: Any) -> Any:
+    """Return a copy of a structure of dicts and lists, sharing only the (immutable) leaf values."""
+    if isinstance(data, dict):
+        return {key: _copy_json(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [_copy_json(item) for item in data]
+    else:
+        return data
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(
+        "Serialized query properties are shared between queries and cannot be modified. "
+        "Use copy.deepcopy() to obtain a modifiable version."
+    )
+
+
+class _ReadOnlyDict(dict):
+    """A dict that cannot be modified, used for the serialized forms of frozen QueryProperty instances"""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return _copy_json(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class _ReadOnlyList(list):
+    """A list that cannot be modified, used for the serialized forms of frozen QueryProperty instances"""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return _copy_json(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def _make_read_only(data: Any) -> Any:
+    """Return a read-only version of a structure of dicts and lists"""
+    if isinstance(data, (_ReadOnlyDict, _ReadOnlyList)):
+        return data
+    elif isinstance(data, dict):
+        return _ReadOnlyDict((key, _make_read_only(value)) for key, value in data.items())
+    elif isinstance(data, list):
+        return _ReadOnlyList(_make_read_only(item) for item in data)
+    else:
+        return data
+
+
 class Filter:
     """
     A filter for querying Knowledge Graph nodes.
@@ -35,6 +109,8 @@ class Filter:
 
     """
 
+    __slots__ = ("operation", "parameter", "value")
+
     def __init__(self, operation: str, parameter: Optional[str] = None, value: Optional[str] = None):
         self.operation = operation
         self.parameter = parameter
@@ -68,6 +144,8 @@ class QueryProperty:
     Methods:
         add_property: Adds a sub-property to the QueryProperty object.
         serialize: Returns a dictionary containing the serialized QueryProperty.
+        freeze: Makes the QueryProperty (and its sub-properties) immutable, and caches the serialized form.
+        copy: Returns a mutable shallow copy of the QueryProperty, which shares its sub-properties.
 
     Example:
         >>> p = QueryProperty(
@@ -79,6 +157,21 @@ class QueryProperty:
         ... )
     """
 
+    __slots__ = (
+        "_frozen",
+        "_serialized",
+        "path",
+        "name",
+        "filter",
+        "sorted",
+        "required",
+        "ensure_order",
+        "properties",
+        "type_filter",
+        "reverse",
+        "expect_single",
+    )
+
     def __init__(
         self,
         path: str,
@@ -92,6 +185,8 @@ class QueryProperty:
         reverse: bool = False,
         expect_single: bool = False,
     ):
+        self._frozen = False
+        self._serialized: Optional[Dict[str, Any]] = None
         self.path = path
         self.name = name
         self.filter = filter
@@ -110,13 +205,62 @@ class QueryProperty:
     def __repr__(self):
         return f"QueryProperty({self.path}, name={self.name})"
 
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Cannot modify frozen {self!r}. Use copy() to obtain a modifiable version.")
+        super().__setattr__(name, value)
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self) -> QueryProperty:
+        """
+        Make this QueryProperty, and all its sub-properties, immutable.
+
+        The serialized form is computed once and then reused,
+        so frozen sub-trees can be shared between queries at little cost.
+        It is read-only, since it is shared: use `copy.deepcopy()` on a generated query
+        to obtain a version that can be modified.
+        """
+        if not self._frozen:
+            for prop in self.properties:
+                prop.freeze()
+            self.properties = tuple(self.properties)
+            self._serialized = _make_read_only(self.serialize())
+            self._frozen = True
+        return self
+
+    def copy(self) -> QueryProperty:
+        """
+        Return a modifiable (unfrozen) shallow copy of this QueryProperty.
+
+        Sub-properties are shared with the original, not copied.
+        """
+        return QueryProperty(
+            self.path,
+            name=self.name,
+            filter=self.filter,
+            sorted=self.sorted,
+            required=self.required,
+            ensure_order=self.ensure_order,
+            properties=list(self.properties),
+            type_filter=self.type_filter,
+            reverse=self.reverse,
+            expect_single=self.expect_single,
+        )
+
     def add_property(self, prop: QueryProperty):
         assert isinstance(prop, QueryProperty)
+        if self._frozen:
+            raise AttributeError(f"Cannot modify frozen {self!r}. Use copy() to obtain a modifiable version.")
         if prop.sorted:
             raise ValueError("Sorting is only allowed on the root level of a query.")
         self.properties.append(prop)
 
     def serialize(self) -> Dict[str, Any]:
+        if self._serialized is not None:
+            return self._serialized
         data: Dict[str, Any] = {
             "path": self.path,
         }
@@ -48,6 +48,8 @@ def lookup_type(class_type: Union[str, List[str]]) -> ContainsMetadata:
             return registry["types"][class_type]
         else:
             return registry["types"][(class_type,)]
+    elif len(class_type) == 1:
+        return lookup_type(class_type[0])
     else:
         return registry["types"][tuple(sorted(class_type))]
 
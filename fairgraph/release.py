@@ -0,0 +1,221 @@
+"""
+This module provides the ReleasePlan class, for releasing (or unreleasing)
+a KG node together with the nodes linked from it.
+"""
+
+# Copyright 2018-2024 CNRS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+from collections import defaultdict
+import logging
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+
+from .base import ContainsMetadata
+from .kgobject import _linked_nodes
+from .utility import chunked, parallel_map
+
+if TYPE_CHECKING:
+    from .client import KGClient
+    from .base import RepresentsSingleObject
+    from .properties import Property
+
+
+logger = logging.getLogger("fairgraph")
+
+# maximum number of instances whose release status is retrieved in a single request
+MAX_INSTANCES_PER_STATUS_REQUEST = 100
+
+
+class ReleasePlan:
+    """
+    Plan for releasing, or unreleasing, a KG node together with its children.
+
+    The set of children is determined once, when the plan is created, and the
+    release status of all nodes is then retrieved in bulk. When the plan is executed,
+    only the nodes whose status needs to change are released (or unreleased),
+    several at a time. Children are released before the nodes that link to them,
+    and unreleased after them.
+
+    Nodes are grouped into levels, such that every node is at a higher level than the nodes
+    it links to. If some nodes cannot be released, the others in the same level are still processed,
+    but the higher levels are left until the failures have been dealt with.
+    Calling :meth:`execute()` again retries only the nodes that are still outstanding.
+
+    Args:
+        root (KGObject or KGProxy): the node to release or unrelease.
+        client: a KGClient
+        action (str): either "release" (the default) or "unrelease".
+        max_depth (int, optional): how many links to follow from the root node.
+            Defaults to 1, i.e. only the nodes linked directly from the root are included.
+            Use None to include all nodes that can be reached from the root.
+        follow (callable, optional): A function which, given a link property and the class
+            of the object it belongs to, returns whether that link should be followed.
+        max_workers (int, optional): The maximum number of requests to the KG to run concurrently.
+            If not provided, `fairgraph.kgobject.MAX_CONCURRENT_QUERIES` is used.
+
+    Example:
+        >>> plan = ReleasePlan(dataset_version, client, max_depth=None)
+        >>> len(plan.outstanding)
+        10231
+        >>> plan.execute(progress=lambda node, n_done, n_total: print(f"{n_done}/{n_total}"))
+    """
+
+    def __init__(
+        self,
+        root: RepresentsSingleObject,
+        client: KGClient,
+        action: str = "release",
+        max_depth: Optional[int] = 1,
+        follow: Optional[Callable[[Property, type], bool]] = None,
+        max_workers: Optional[int] = None,
+    ):
+        if action not in ("release", "unrelease"):
+            raise ValueError("action should be 'release' or 'unrelease'")
+        if max_workers is None:
+            from .kgobject import MAX_CONCURRENT_QUERIES as max_workers
+        self.client = client
+        self.action = action
+        self.max_workers = max_workers
+        if not hasattr(root, "traverse"):  # i.e. a KGProxy
+            # unreleased nodes are only available in the "in progress" scope
+            root = root.resolve(client, scope="in progress")
+        self.root = root
+        nodes = {root.id: root}
+        for path, node in root.traverse(client, max_depth=max_depth, follow=follow, scope="in progress"):
+            if node.id:
+                nodes.setdefault(node.id, node)
+        # the links between nodes in the plan; nodes at `max_depth` have not been retrieved, so have no children here
+        children = {
+            uri: [child.id for _, child in _linked_nodes(node, follow) if child.id in nodes and child.id != uri]
+            if isinstance(node, ContainsMetadata)
+            else []
+            for uri, node in nodes.items()
+        }
+        # nodes grouped by their height, i.e. the longest chain of links to a node without children,
+        # so that each node is at a higher level than all of its children
+        heights = _heights(children)
+        self.levels: Dict[int, List[RepresentsSingleObject]] = defaultdict(list)
+        for uri, node in nodes.items():
+            self.levels[heights[uri]].append(node)
+        self.status: Dict[str, Optional[bool]] = {}
+        self.done: set = set()
+        self.failures: Dict[str, Exception] = {}
+        # the value returned by the client for each node processed
+        self.responses: Dict[str, Any] = {}
+        self.check_status()
+
+    @property
+    def nodes(self) -> List[RepresentsSingleObject]:
+        """All the nodes covered by the plan, in the order in which they will be processed."""
+        heights = sorted(self.levels, reverse=(self.action == "unrelease"))
+        return [node for height in heights for node in self.levels[height]]
+
+    @property
+    def outstanding(self) -> List[RepresentsSingleObject]:
+        """The nodes which still need to be released (or unreleased)."""
+        return [node for node in self.nodes if self._needs_action(node)]
+
+    def _needs_action(self, node: RepresentsSingleObject) -> bool:
+        if node.id in self.done:
+            return False
+        released = self.status.get(node.id)
+        if self.action == "release":
+            # where the status is unknown (None), we try anyway
+            return not released
+        else:
+            return released is not False
+
+    def check_status(self):
+        """Retrieve the current release status of all the nodes in the plan, in bulk."""
+        ids = [node.id for node in self.nodes]
+        chunks = list(chunked(ids, MAX_INSTANCES_PER_STATUS_REQUEST))
+        for statuses in parallel_map(self.client.are_released, chunks, max_workers=self.max_workers):
+            self.status.update(statuses)
+        self.done = set()
+
+    def execute(self, progress: Optional[Callable[[RepresentsSingleObject, int, int], Any]] = None) -> bool:
+        """
+        Release (or unrelease) all the outstanding nodes.
+
+        Args:
+            progress (callable, optional): a function which will be called after each node
+                has been processed, with the node, the number of nodes processed so far,
+                and the total number of nodes to process.
+
+        Returns:
+            True if all the nodes were processed successfully. Otherwise the nodes that failed,
+            and the errors, are available in the `failures` attribute, and `execute()`
+            can be called again to retry. The values returned by the client for each node
+            are available in the `responses` attribute.
+        """
+        outstanding = self.outstanding
+        total = len(outstanding)
+        n_done = 0
+        self.failures = {}
+        heights = sorted(self.levels, reverse=(self.action == "unrelease"))
+        to_process = {node.id for node in outstanding}
+        action = self.client.release if self.action == "release" else self.client.unrelease
+
+        def _process(node):
+            try:
+                return action(node.id), None
+            except Exception as err:
+                return None, err
+
+        for height in heights:
+            level = [node for node in self.levels[height] if node.id in to_process]
+            for node, (response, err) in zip(level, parallel_map(_process, level, max_workers=self.max_workers)):
+                if err is None:
+                    self.done.add(node.id)
+                    self.responses[node.id] = response
+                    self.status[node.id] = self.action == "release"
+                else:
+                    logger.warning(f"Unable to {self.action} {node.id}: {err}")
+                    self.failures[node.id] = err
+                n_done += 1
+                if progress:
+                    progress(node, n_done, total)
+            if self.failures:
+                # releasing a parent before all its children could expose links to unreleased nodes,
+                # and unreleasing children of a node which is still released would break its links
+                break
+        return not self.failures
+
+
+def _heights(children: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    Return the height of each node in the graph defined by `children`, which maps the id of
+    each node to the ids of its children: 0 for nodes without children, otherwise one more
+    than the greatest height of the children. Links which would close a cycle are ignored.
+    """
+    heights: Dict[str, int] = {}
+    for start in children:
+        if start in heights:
+            continue
+        # depth-first, without recursion, as chains of links may be long
+        stack = [(start, iter(children[start]))]
+        on_stack = {start}
+        while stack:
+            uri, remaining = stack[-1]
+            for child in remaining:
+                if child not in heights and child not in on_stack:
+                    stack.append((child, iter(children[child])))
+                    on_stack.add(child)
+                    break
+            else:
+                stack.pop()
+                on_stack.discard(uri)
+                heights[uri] = 1 + max((heights[child] for child in children[uri] if child in heights), default=-1)
+    return heights
@@ -18,10 +18,19 @@
 # limitations under the License.
 
 from __future__ import annotations
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 import hashlib
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, TYPE_CHECKING
+from itertools import islice, product
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 import warnings
 
+from .errors import DeadlineExceeded
+
 if TYPE_CHECKING:
     from .client import KGClient
     from .kgobject import KGObject
@@ -61,6 +70,52 @@ def as_list(obj: Union[None, KGObject, dict, str, list, tuple]) -> list:
     return L
 
 
+class InternTable:
+    """
+    A bounded table of strings, used to share a single copy of strings
+    that are repeated in many JSON-LD documents, such as URIs and space names.
+
+    Unlike `sys.intern()`, strings can be released: the table is emptied when it is full.
+
+    Example:
+        >>> intern_uri = InternTable()
+        >>> a = intern_uri("https://openminds.ebrains.eu/vocab/" + "name")
+        >>> b = intern_uri("https://openminds.ebrains.eu/vocab/" + "name")
+        >>> a is b
+        True
+    """
+
+    __slots__ = ("maxsize", "_strings")
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._strings: Dict[str, str] = {}
+
+    def __call__(self, value: str) -> str:
+        try:
+            return self._strings[value]
+        except KeyError:
+            if len(self._strings) >= self.maxsize:
+                self._strings.clear()
+            self._strings[value] = value
+            return value
+
+    def __len__(self):
+        return len(self._strings)
+
+
+intern_uri = InternTable()
+
+
+def intern_types(types: Union[str, List[str]]) -> Union[str, List[str]]:
+    """Return an interned type URI, or a new list containing the interned members of a list of type URIs."""
+    if isinstance(types, str):
+        return intern_uri(types)
+    elif isinstance(types, list):
+        return [intern_uri(type_) if isinstance(type_, str) else type_ for type_ in types]
+    return types
+
+
 def invert_dict(D):
     newD = {}
     for key, value in D.items():
@@ -198,13 +253,17 @@ def normalize_data(data: Union[None, JSONdict], context: Dict[str, Any]) -> Unio
         else:
             result = expand_uri(key, context)
             assert isinstance(result, str)  # for type checking
-            expanded_key = result
+            expanded_key = intern_uri(result)
         assert expanded_key.startswith("http") or expanded_key.startswith("@") or expanded_key.startswith("Q")
         if hasattr(value, "__len__") and len(value) == 0:
             pass
         elif value is None:
             pass
-        elif isinstance(value, (list, tuple)) and key != "@type":
+        elif key == "@type":
+            normalized[expanded_key] = intern_types(value)
+        elif key == "@id" and isinstance(value, str):
+            normalized[expanded_key] = intern_uri(value)
+        elif isinstance(value, (list, tuple)):
             # note that we special-case "@type" for now
             normalized[expanded_key] = []
             for item in value:
@@ -271,6 +330,179 @@ def expand_filter(filter_dict: Dict[str, Any]):
     return expanded
 
 
+def chunked(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """
+    Split an iterable into lists containing at most `chunk_size` items.
+
+    Example:
+    >>> list(chunked([1, 2, 3, 4, 5], 2))
+    [[1, 2], [3, 4], [5]]
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def split_filter(filter_dict: Dict[str, Any], chunk_size: int) -> List[Dict[str, Any]]:
+    """
+    Split a (single-level) filter specification whose values contain long lists
+    into several filter specifications, each containing lists of at most `chunk_size` items.
+
+    The union of the results of querying with each of the returned filters is the same
+    as the result of querying with the original filter.
+
+    Example:
+    >>> split_filter({"name": "foo", "is_part_of": ["a", "b", "c"]}, 2)
+    [{'name': 'foo', 'is_part_of': ['a', 'b']}, {'name': 'foo', 'is_part_of': ['c']}]
+    """
+    long_keys = [
+        key for key, value in filter_dict.items() if isinstance(value, (list, tuple)) and len(value) > chunk_size
+    ]
+    if not long_keys:
+        return [filter_dict]
+    chunks_per_key = [[(key, chunk) for chunk in chunked(filter_dict[key], chunk_size)] for key in long_keys]
+    split_filters = []
+    for combination in product(*chunks_per_key):
+        sub_filter = filter_dict.copy()
+        sub_filter.update(combination)
+        split_filters.append(sub_filter)
+    return split_filters
+
+
+# the time (from time.monotonic()) by which the current operation should complete, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Context manager within which all requests to the KG must complete within `timeout` seconds.
+
+    This applies to the operation as a whole, including any nested requests, e.g. when following links.
+    The time remaining is passed as the timeout of each request to the KG,
+    and when the deadline expires, work still outstanding is cancelled, and DeadlineExceeded is raised.
+    Deadlines can be nested, in which case the earliest one applies. If `timeout` is None, there is no limit.
+
+    Example:
+        >>> with deadline(10):
+        ...     datasets = DatasetVersion.list(client, size=1000, prefetch=["license"])
+    """
+    if timeout is None:
+        yield
+        return
+    expires = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None:
+        expires = min(expires, current)
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Return the number of seconds left before the current deadline, or None if there isn't one."""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return max(expires - time.monotonic(), 0.0)
+
+
+def iterate_with_deadline(iterator: Iterator[Any], timeout: Optional[float]) -> Iterator[Any]:
+    """
+    Yield the items from `iterator`, raising DeadlineExceeded if the iteration
+    has not finished within `timeout` seconds of starting.
+    """
+    if timeout is None:
+        yield from iterator
+        return
+    expires = time.monotonic() + timeout
+    while True:
+        with deadline(expires - time.monotonic()):
+            if remaining_time() <= 0:
+                raise DeadlineExceeded("Deadline exceeded")
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+# the maximum number of threads used by parallel_map(), shared between all calls
+MAX_THREADS = 16
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# True within tasks run by parallel_map(), which then run any nested calls sequentially,
+# since tasks waiting for other tasks could otherwise occupy all the threads
+_in_worker: ContextVar[bool] = ContextVar("in_worker", default=False)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="fairgraph")
+        return _executor
+
+
+def _run_task(func: Callable[[Any], Any], item: Any) -> Any:
+    _in_worker.set(True)
+    return func(item)
+
+
+def parallel_map(func: Callable[[Any], Any], items: Iterable[Any], max_workers: Optional[int] = None) -> Iterator[Any]:
+    """
+    Apply `func` to each of `items`, using a pool of threads shared by all calls,
+    with at most `max_workers` tasks from this call running at once.
+
+    Results are yielded in the same order as `items`, as soon as they are available.
+    With `max_workers` of None or 1, with a single item, or when called from within another task,
+    `func` is applied sequentially in the calling thread.
+
+    Context variables (e.g. an active identity map) are copied into the worker threads.
+    If the current deadline expires, DeadlineExceeded is raised, and tasks which have not yet started
+    are cancelled. Tasks which are running cannot be interrupted, but their requests to the KG
+    time out at the deadline too.
+    """
+    items = list(items)
+    if max_workers is None or max_workers <= 1 or len(items) <= 1 or _in_worker.get():
+        for item in items:
+            yield func(item)
+        return
+    executor = _get_executor()
+    pending = iter(items)
+    futures: Deque[Future] = deque()
+    try:
+        while True:
+            # keep up to `max_workers` tasks running
+            running = sum(1 for future in futures if not future.done())
+            for item in islice(pending, max_workers - running):
+                # each task needs its own copy of the context, as a context cannot be entered in two threads at once
+                futures.append(executor.submit(copy_context().run, _run_task, func, item))
+            if not futures:
+                return
+            if futures[0].done():
+                yield futures.popleft().result()
+            else:
+                done, not_done = wait(
+                    [future for future in futures if not future.done()],
+                    timeout=remaining_time(),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    raise DeadlineExceeded("Deadline exceeded while waiting for concurrent requests")
+    finally:
+        # if the consumer stops early, or the deadline has expired, don't start work that is no longer needed
+        for future in futures:
+            future.cancel()
+
+
 def sha1sum(filename):
     BUFFER_SIZE = 128 * 1024
     h = hashlib.sha1()
@@ -295,6 +527,8 @@ class LogEntry:
         type_ (str): The type of the log entry.
     """
 
+    __slots__ = ("cls", "id", "delta", "space", "type")
+
     def __init__(
         self,
         cls: str,
@@ -3,13 +3,27 @@
 Tests of fairgraph.base module.
 """
 
+from copy import deepcopy
+import json
+import threading
+import time
 from datetime import date, datetime
+import fairgraph.kgproxy
+from fairgraph.base import ErrorHandling, trusted_construction, validate
 from fairgraph.embedded import EmbeddedMetadata
 from fairgraph.kgobject import KGObject
-from fairgraph.kgproxy import KGProxy
+from fairgraph.kgproxy import KGProxy, DeferredObject, batching, resolve_many
+from fairgraph.kgquery import KGQuery
 from fairgraph.properties import Property
-from fairgraph.caching import generate_cache_key
+from fairgraph.release import ReleasePlan
+from fairgraph.caching import SharedObjects, generate_cache_key, identity_map, object_cache
+from fairgraph.errors import DeadlineExceeded, ReleaseError, ResolutionFailure
+from fairgraph.utility import as_list, remaining_time
 import pytest
+from .utils import clean_object_cache, mock_clock
+
+# many of these tests retrieve objects, which would otherwise be left in the global cache
+pytestmark = pytest.mark.usefixtures("clean_object_cache")
 
 
 class MockEmbeddedObject(EmbeddedMetadata):
@@ -470,6 +484,28 @@ class TestKGObject(object):
         }
         assert obj.modified_data() == expected
 
+    def test_modified_data_after_loading(self):
+        orig_object = self._construct_object_required_properties()
+        expected_remote_data = orig_object.to_jsonld(include_empty_properties=True)
+        data = deepcopy(expected_remote_data)
+        data["@context"] = orig_object.context
+        obj = MockKGObject.from_kg_instance(data, client=None)
+        # remote_data is only computed when first needed, but it should reflect
+        # the values when the object was loaded, even if they have since been changed
+        assert obj._remote_data is None
+        obj.a_required_string = "pomme"
+        obj.a_required_list_of_strings.append("cherry")
+        obj.a_required_embedded_object.a_number = -1.0
+        assert obj.remote_data == expected_remote_data
+        assert obj.modified_data() == {
+            "https://openminds.ebrains.eu/vocab/aRequiredString": "pomme",
+            "https://openminds.ebrains.eu/vocab/aRequiredListOfStrings": ["banana", "pear", "cherry"],
+            "https://openminds.ebrains.eu/vocab/aRequiredEmbeddedObject": {
+                "@type": ["https://openminds.ebrains.eu/mock/MockEmbeddedObject"],
+                "https://openminds.ebrains.eu/vocab/aNumber": -1.0,
+            },
+        }
+
     def test_update(self):
         obj = self._construct_object_required_properties()
         assert obj.an_optional_datetime == None
@@ -611,3 +647,916 @@ class TestKGProxy:
             "KGProxy([<class 'test.test_base.MockKGObject'>], "
             "'https://kg.ebrains.eu/api/instances/00000000-0000-0000-0000-000000001234')"
         )
+
+    def test_no_instance_dict(self):
+        # proxies are created in large numbers, so should be as compact as possible
+        proxy = KGProxy(MockKGObject, "https://kg.ebrains.eu/api/instances/00000000-0000-0000-0000-000000001234")
+        assert not hasattr(proxy, "__dict__")
+        with pytest.raises(AttributeError):
+            proxy.foo = "bar"
+
+    def test_initialization_without_preferred_scope(self):
+        uri = "https://kg.ebrains.eu/api/instances/00000000-0000-0000-0000-000000001234"
+        proxy = KGProxy(MockKGObject, uri, preferred_scope=None)
+        assert proxy.preferred_scope is None
+
+
+class MockBundle(KGObject):
+    default_space = "mock"
+    type_ = "https://openminds.ebrains.eu/mock/MockBundle"
+    context = {
+        "vocab": "https://openminds.ebrains.eu/vocab/",
+    }
+    properties = [
+        Property("name", str, "vocab:name", multiple=False, required=False),
+    ]
+    reverse_properties = [
+        Property("has_parts", "test_base.MockFile", "^vocab:isPartOf", reverse="is_part_of", multiple=True),
+    ]
+
+
+class MockFile(KGObject):
+    default_space = "mock"
+    type_ = "https://openminds.ebrains.eu/mock/MockFile"
+    context = {
+        "vocab": "https://openminds.ebrains.eu/vocab/",
+    }
+    properties = [
+        Property("name", str, "vocab:name", multiple=False, required=True),
+        Property("is_part_of", MockBundle, "vocab:isPartOf", multiple=True, required=False),
+        Property("release_date", date, "vocab:releaseDate", multiple=False, required=False),
+    ]
+    reverse_properties = []
+
+
+class MockQueryResponse:
+    def __init__(self, data, total):
+        self.data = data
+        self.error = None
+        self.total = total
+
+
+class MockFileClient:
+    """
+    Mock client that returns one MockFile per bundle given in the "is_part_of" filter,
+    plus a file that is part of every bundle.
+    """
+
+    _private_space = "myspace_1234"
+    all_bundle_ids = [f"{ID_NAMESPACE}00000000-0000-0000-0001-{n:012d}" for n in range(25)]
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query, filter=None, space=None, size=100, from_index=0, scope="released"):
+        self.queries.append((query, from_index, size))
+        bundle_ids = []
+        for prop in query["structure"]:
+            if prop.get("propertyName") == "Qis_part_of":
+                bundle_ids = as_list(prop["structure"][0]["filter"]["value"])
+        files = [
+            {
+                "@id": f"{ID_NAMESPACE}00000000-0000-0000-0002-{bundle_id[-12:]}",
+                "@type": [MockFile.type_],
+                "vocab:name": f"file-for-{bundle_id.split('/')[-1]}",
+                "vocab:isPartOf": [{"@id": bundle_id, "@type": [MockBundle.type_]}],
+                # bundles with higher numbers have older files
+                "vocab:releaseDate": f"2020-01-{31 - int(bundle_id[-12:]):02d}",
+            }
+            for bundle_id in bundle_ids
+        ]
+        files.append(
+            {
+                "@id": f"{ID_NAMESPACE}00000000-0000-0000-0000-000000000000",
+                "@type": [MockFile.type_],
+                "vocab:name": "shared-file",
+                "vocab:isPartOf": [
+                    {"@id": bundle_id, "@type": [MockBundle.type_]} for bundle_id in self.all_bundle_ids
+                ],
+                "vocab:releaseDate": "2020-01-15",
+            }
+        )
+        for prop in query["structure"]:
+            if prop.get("sort"):
+                files.sort(key=lambda f: f[prop["propertyName"]])
+        return MockQueryResponse(files[from_index : from_index + size], total=len(files))
+
+
+def test_list_with_long_list_filter(monkeypatch):
+    monkeypatch.setattr("fairgraph.kgobject.FILTER_CHUNK_SIZE", 10)
+    client = MockFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids
+
+    files = MockFile.list(client, is_part_of=bundle_ids, size=1000)
+
+    assert len(client.queries) == 3
+    # the file that is part of every bundle should appear only once
+    assert len(files) == 26
+    assert len(set(f.id for f in files)) == 26
+    assert sum(1 for f in files if f.name == "shared-file") == 1
+
+    files = MockFile.list(client, is_part_of=bundle_ids, size=5, from_index=8)
+    assert [f.name for f in files] == [
+        "file-for-00000000-0000-0000-0001-000000000008",
+        "file-for-00000000-0000-0000-0001-000000000009",
+        "shared-file",
+        "file-for-00000000-0000-0000-0001-000000000010",
+        "file-for-00000000-0000-0000-0001-000000000011",
+    ]
+
+    # the count matches the listing, in which the shared file appears only once
+    client.queries = []
+    assert MockFile.count(client, is_part_of=bundle_ids) == 26
+    # and only the ids of the files are retrieved
+    for query, from_index, size in client.queries:
+        assert "vocab:name" not in [prop.get("propertyName") for prop in query["structure"]]
+
+
+def test_iterate_fetches_pages_lazily():
+    client = MockFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids
+
+    iterator = MockFile.iterate(client, is_part_of=bundle_ids, page_size=10)
+    first_files = [next(iterator) for i in range(5)]
+    assert len(client.queries) == 1
+    remaining_files = list(iterator)
+    assert len(client.queries) == 3
+    assert len(first_files) + len(remaining_files) == 26
+
+
+def test_load_reverse(monkeypatch):
+    monkeypatch.setattr("fairgraph.kgobject.FILTER_CHUNK_SIZE", 10)
+    client = MockFileClient()
+    bundles = [MockBundle(id=bundle_id) for bundle_id in MockFileClient.all_bundle_ids]
+
+    retrieved = MockBundle.load_reverse(bundles, "has_parts", client)
+
+    assert len(client.queries) == 3
+    assert len(retrieved) == 26
+    for bundle in bundles:
+        assert len(bundle.has_parts) == 2
+        names = sorted(f.name for f in bundle.has_parts)
+        assert names == [f"file-for-{bundle.uuid}", "shared-file"]
+    # the retrieved objects are not added to the cache
+    assert not any(f.id in object_cache for f in retrieved)
+
+    with pytest.raises(ValueError):
+        MockBundle.load_reverse(bundles, "name", client)
+
+    # a property with a single value cannot take the values from several objects
+    prop = MockBundle._property_lookup["has_parts"]
+    monkeypatch.setattr(prop, "multiple", False)
+    monkeypatch.setattr(prop, "error_handling", ErrorHandling.error)
+    with pytest.raises(ValueError, match="Single item expected"):
+        MockBundle.load_reverse(bundles, "has_parts", client)
+
+
+def test_list_with_order_by(monkeypatch):
+    monkeypatch.setattr("fairgraph.kgobject.FILTER_CHUNK_SIZE", 10)
+    client = MockFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids
+
+    query = MockFile.generate_query(client, space=None, order_by="release_date")
+    sorted_props = [prop["propertyName"] for prop in query["structure"] if prop.get("sort")]
+    assert sorted_props == ["vocab:releaseDate"]
+
+    # single query, ascending and descending
+    files = MockFile.list(client, is_part_of=bundle_ids[:5], order_by="release_date")
+    assert [f.release_date.day for f in files] == [15, 27, 28, 29, 30, 31]
+    files = MockFile.list(client, is_part_of=bundle_ids[:5], order_by="-release_date", from_index=1, size=3)
+    assert [f.release_date.day for f in files] == [30, 29, 28]
+
+    # results from several sub-queries are merged in order
+    files = MockFile.list(client, is_part_of=bundle_ids, order_by="release_date", size=5)
+    assert [f.release_date.day for f in files] == [7, 8, 9, 10, 11]
+    files = MockFile.list(client, is_part_of=bundle_ids, order_by="-release_date", from_index=16, size=3)
+    assert [f.release_date.day for f in files] == [15, 15, 14]
+
+    with pytest.raises(ValueError):
+        MockFile.list(client, order_by="is_part_of")
+    with pytest.raises(ValueError):
+        MockFile.list(client, order_by="release_date", api="core")
+
+
+def test_deserialization_does_not_modify_the_input_document():
+    data = {
+        "@id": f"{ID_NAMESPACE}00000000-0000-0000-0002-000000000001",
+        "@type": [MockFile.type_],
+        "https://core.kg.ebrains.eu/vocab/meta/space": "mock",
+        "vocab:name": "file",
+        "vocab:isPartOf": [{"@id": "kg:00000000-0000-0000-0001-000000000001", "@type": [MockBundle.type_]}],
+    }
+    original = deepcopy(data)
+    linked_types = data["vocab:isPartOf"][0]["@type"]
+    for lazy in (False, True):
+        obj = MockFile.from_kg_instance(data, client=None, lazy=lazy)
+        assert as_list(obj.is_part_of)[0].id == f"{ID_NAMESPACE}00000000-0000-0000-0001-000000000001"
+        assert obj.space == "mock"
+        assert data == original
+        assert data["vocab:isPartOf"][0]["@type"] is linked_types
+
+
+def test_documents_share_repeated_strings():
+    def make_document(n):
+        # each document is decoded separately, so repeated strings are not shared to begin with
+        return json.loads(
+            json.dumps(
+                {
+                    "@id": f"{ID_NAMESPACE}00000000-0000-0000-0002-00000000000{n}",
+                    "@type": [MockFile.type_],
+                    "https://core.kg.ebrains.eu/vocab/meta/space": "mock",
+                    "vocab:name": f"file{n}",
+                    "vocab:isPartOf": {"@id": f"{ID_NAMESPACE}00000000-0000-0000-0001-000000000001"},
+                }
+            )
+        )
+
+    a, b = (MockFile.from_kg_instance(make_document(n), client=None) for n in (1, 2))
+    raw_a, raw_b = a._raw_remote_data, b._raw_remote_data
+    assert raw_a["@type"][0] is raw_b["@type"][0]
+    assert a.space is b.space
+    assert raw_a["vocab:isPartOf"]["@id"] is raw_b["vocab:isPartOf"]["@id"]
+    assert [key for key in raw_a if key == "vocab:name"][0] is [key for key in raw_b if key == "vocab:name"][0]
+
+
+def test_deserialize_data_with_type_filters():
+    data = {
+        "@id": f"{ID_NAMESPACE}00000000-0000-0000-0001-000000000000",
+        "@type": [MockBundle.type_],
+        "https://openminds.ebrains.eu/vocab/name": "bundle",
+        "vocab:isPartOf__MockFile": [
+            {"@id": f"{ID_NAMESPACE}00000000-0000-0000-0002-000000000001", "@type": [MockFile.type_]},
+            {"@id": f"{ID_NAMESPACE}00000000-0000-0000-0003-000000000001", "@type": [MockBundle.type_]},
+        ],
+    }
+    for i in range(2):  # the second time around, cached key mappings are used
+        deserialized = MockBundle._deserialize_data(data, client=None, include_id=True)
+        assert deserialized["name"] == "bundle"
+        assert [part.id for part in as_list(deserialized["has_parts"])] == [data["vocab:isPartOf__MockFile"][0]["@id"]]
+
+    key_map, property_plan = MockBundle.__dict__["_deserialization_plan"]
+    assert key_map["vocab:isPartOf__MockFile"] == ("https://openminds.ebrains.eu/vocab/isPartOf", "MockFile")
+    assert key_map["@id"] is None
+    assert list(property_plan) == ["name", "has_parts"]
+
+
+def test_list_lazy():
+    client = MockFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids[:3]
+    files = MockFile.list(client, is_part_of=bundle_ids, lazy=True)
+    eager_files = MockFile.list(client, is_part_of=bundle_ids)
+    assert len(files) == 4
+    for file in files:
+        assert "name" not in file.__dict__
+        assert "release_date" not in file.__dict__
+    assert [f.name for f in files] == [f.name for f in eager_files]
+    assert "name" in files[0].__dict__
+    assert "release_date" not in files[0].__dict__
+    assert files[0].release_date == eager_files[0].release_date
+    for file, eager_file in zip(files, eager_files):
+        assert file.to_jsonld() == eager_file.to_jsonld()
+
+    files[1].name = "renamed"
+    files[1].is_part_of = [files[1].is_part_of, MockBundle(id=bundle_ids[2])]
+    assert files[1].modified_data() == {
+        "https://openminds.ebrains.eu/vocab/name": "renamed",
+        "https://openminds.ebrains.eu/vocab/isPartOf": [{"@id": bundle_ids[1]}, {"@id": bundle_ids[2]}],
+    }
+
+
+def test_validation_of_objects_from_kg():
+    data = [
+        {
+            "@id": f"{ID_NAMESPACE}00000000-0000-0000-0002-00000000000{i}",
+            "@type": [MockFile.type_],
+            "https://openminds.ebrains.eu/vocab/name": name,
+        }
+        for i, name in enumerate(["file.txt", 42, None])
+    ]
+    MockFile.set_error_handling("error", "name")
+    try:
+        # data from the KG are not validated when creating objects, so no errors are raised here
+        files = [MockFile.from_kg_instance(item, client=None) for item in data]
+        with pytest.raises(ValueError):
+            MockFile(name=42)
+        # but documents supplied by the user are
+        assert MockFile.from_jsonld(data[0], client=None).name == "file.txt"
+        for item in data[1:]:
+            with pytest.raises(ValueError):
+                MockFile.from_jsonld(item, client=None)
+            with trusted_construction():
+                with pytest.raises(ValueError):
+                    MockFile.from_jsonld(item, client=None)
+    finally:
+        MockFile.set_error_handling("log", "name")
+
+    assert files[0].validate() == []
+    assert files[1].validate() == ["Property 'name' should be of type (<class 'str'>,), not <class 'int'>"]
+    results = validate(files)
+    assert [obj for obj, errors in results] == [files[1], files[2]]
+    assert results[1][1] == ["Property 'name' is required but was not provided."]
+
+
+def test_list_table(monkeypatch):
+    monkeypatch.setattr("fairgraph.kgobject.FILTER_CHUNK_SIZE", 10)
+    client = MockFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids
+
+    table = MockFile.list_table(
+        client,
+        columns=["id", "name", "release_date", "is_part_of", "is_part_of.name"],
+        is_part_of=bundle_ids[:2],
+        as_dataframe=False,
+    )
+    assert list(table) == ["id", "name", "release_date", "is_part_of", "is_part_of.name"]
+    assert table["id"] == [
+        f"{ID_NAMESPACE}00000000-0000-0000-0002-000000000000",
+        f"{ID_NAMESPACE}00000000-0000-0000-0002-000000000001",
+        f"{ID_NAMESPACE}00000000-0000-0000-0000-000000000000",
+    ]
+    assert table["name"][:2] == [
+        "file-for-00000000-0000-0000-0001-000000000000",
+        "file-for-00000000-0000-0000-0001-000000000001",
+    ]
+    assert [value.day for value in table["release_date"]] == [31, 30, 15]
+    assert table["is_part_of"][:2] == [[bundle_ids[0]], [bundle_ids[1]]]
+    assert table["is_part_of"][2] == bundle_ids
+    assert table["is_part_of.name"][2] == [None] * len(bundle_ids)  # the mock client doesn't provide names
+
+    # only the requested properties, and the filter, are in the query
+    query = client.queries[0][0]
+    property_names = [prop.get("propertyName") for prop in query["structure"]]
+    assert "vocab:name" in property_names
+    assert "vocab:isPartOf" in property_names
+    assert "Qis_part_of" in property_names
+    # is_part_of is followed, so that the names of the bundles are retrieved
+    is_part_of = [prop for prop in query["structure"] if prop.get("propertyName") == "vocab:isPartOf"][0]
+    # and only the requested properties of the bundles are retrieved
+    assert [prop.get("propertyName") for prop in is_part_of["structure"]] == [None, None, "vocab:name"]
+    assert [prop["path"] for prop in is_part_of["structure"][:2]] == ["@id", "@type"]
+
+    # counting linked objects retrieves only their ids
+    client.queries = []
+    table = MockFile.list_table(client, columns=["count(is_part_of)"], is_part_of=bundle_ids[:2], as_dataframe=False)
+    assert table == {"count(is_part_of)": [1, 1, len(bundle_ids)]}
+    is_part_of = [prop for prop in client.queries[0][0]["structure"] if prop.get("propertyName") == "vocab:isPartOf"]
+    assert is_part_of[0]["structure"] == [{"path": "@id"}]
+
+    # results from several sub-queries
+    table = MockFile.list_table(client, columns=["name"], is_part_of=bundle_ids, size=5, as_dataframe=False)
+    assert len(table["name"]) == 5
+
+    with pytest.raises(ValueError):
+        MockFile.list_table(client, columns=["name.foo"], as_dataframe=False)
+
+
+def test_list_table_as_dataframe():
+    pd = pytest.importorskip("pandas")
+    client = MockFileClient()
+    df = MockFile.list_table(client, columns=["id", "name"], is_part_of=MockFileClient.all_bundle_ids[:2])
+    assert isinstance(df, pd.DataFrame)
+    assert list(df.columns) == ["id", "name"]
+    assert len(df) == 3
+
+
+def test_list_raw():
+    client = MockFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids[:2]
+    documents = MockFile.list(client, is_part_of=bundle_ids, raw=True)
+    assert len(documents) == 3
+    assert all(isinstance(doc, dict) for doc in documents)
+    assert documents[0] == {
+        "@context": MockFile.context,
+        "@id": f"{ID_NAMESPACE}00000000-0000-0000-0002-000000000000",
+        "@type": [MockFile.type_],
+        "https://openminds.ebrains.eu/vocab/name": "file-for-00000000-0000-0000-0001-000000000000",
+        "https://openminds.ebrains.eu/vocab/isPartOf": {"@id": bundle_ids[0], "@type": [MockBundle.type_]},
+        "https://openminds.ebrains.eu/vocab/releaseDate": "2020-01-31",
+    }
+
+    query = KGQuery(MockFile, {"is_part_of": bundle_ids})
+    assert query.resolve(client, raw=True) == documents
+
+
+class MockExpandedFileClient(MockFileClient):
+    """Mock client that returns the names of the bundles, as when following links"""
+
+    def query(self, query, filter=None, space=None, size=100, from_index=0, scope="released"):
+        response = super().query(query, filter=filter, space=space, size=size, from_index=from_index, scope=scope)
+        for file in response.data:
+            for bundle in file["vocab:isPartOf"]:
+                bundle["vocab:name"] = f"bundle-{bundle['@id'][-2:]}"
+        return response
+
+
+def test_linked_nodes_are_shared():
+    client = MockExpandedFileClient()
+    bundle_ids = MockFileClient.all_bundle_ids[:3]
+    files = MockFile.list(client, is_part_of=bundle_ids, follow_links={"is_part_of": {}})
+    assert len(files) == 4
+    shared_file = files[-1]
+    assert shared_file.name == "shared-file"
+    assert [bundle.name for bundle in shared_file.is_part_of[:3]] == ["bundle-00", "bundle-01", "bundle-02"]
+    for file, bundle in zip(files[:3], shared_file.is_part_of):
+        assert isinstance(bundle, MockBundle)
+        assert file.is_part_of is bundle
+
+    # sharing is per response, unless the client has an identity map
+    files_again = MockFile.list(client, is_part_of=bundle_ids, follow_links={"is_part_of": {}})
+    assert files_again[0].is_part_of is not files[0].is_part_of
+    client.identity_map = SharedObjects()
+    files = MockFile.list(client, is_part_of=bundle_ids, follow_links={"is_part_of": {}})
+    files_again = MockFile.list(client, is_part_of=bundle_ids, follow_links={"is_part_of": {}})
+    assert files_again[0].is_part_of is files[0].is_part_of
+
+    # objects are not shared between scopes
+    files_in_progress = MockFile.list(
+        client, is_part_of=bundle_ids, scope="in progress", follow_links={"is_part_of": {}}
+    )
+    assert files_in_progress[0].is_part_of is not files[0].is_part_of
+
+    # objects are dropped from the map when modified or deleted, or no longer used
+    bundle_id = files[0].is_part_of.id
+    client.identity_map.discard(bundle_id)
+    assert bundle_id not in client.identity_map.for_scope("released")
+    n_shared = len(client.identity_map)
+    del files, files_again
+    assert len(client.identity_map) < n_shared
+
+
+def test_linked_nodes_at_different_depths_are_merged():
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0009-{n:012d}" for n in range(4)]
+    shallow = {"@id": ids[2], "@type": [MockNode.type_], "vocab:name": "node-2", "vocab:subnodes": [{"@id": ids[3]}]}
+    deep = {
+        "@id": ids[2],
+        "@type": [MockNode.type_],
+        "vocab:name": "node-2",
+        "vocab:subnodes": [{"@id": ids[3], "@type": [MockNode.type_], "vocab:name": "node-3"}],
+    }
+    data = {
+        "@id": ids[0],
+        "@type": [MockNode.type_],
+        "vocab:name": "node-0",
+        "vocab:subnodes": [
+            shallow,
+            {"@id": ids[1], "@type": [MockNode.type_], "vocab:name": "node-1", "vocab:subnodes": [deep]},
+        ],
+    }
+    with identity_map():
+        root = MockNode.from_kg_instance(data, client=None)
+    node2, node1 = root.subnodes
+    # a single object, with the links expanded in the deeper copy
+    assert node1.subnodes is node2
+    assert isinstance(node2.subnodes, MockNode)
+    assert node2.subnodes.name == "node-3"
+
+
+class MockBulkClient:
+    """Mock client that returns a MockBundle for every id ending with an even number"""
+
+    def __init__(self):
+        self.requests = []
+
+    def instances_from_full_uris(self, uris, use_cache=True, scope="released"):
+        self.requests.append((list(uris), scope))
+        return {
+            uri: {"@id": uri, "@type": [MockBundle.type_], "vocab:name": f"bundle-{uri[-2:]}"}
+            if int(uri[-1]) % 2 == 0
+            else None
+            for uri in uris
+        }
+
+
+def test_resolve_many():
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0003-{n:012d}" for n in range(6)]
+    object_cache[ids[4]] = cached_bundle = MockBundle(name="cached", id=ids[4])
+    proxies = [KGProxy(MockBundle, uri) for uri in ids] + [KGProxy(MockBundle, ids[0])]
+    client = MockBulkClient()
+    results = resolve_many(proxies, client)
+
+    # only instances not already in the cache are requested, each of them only once
+    assert client.requests == [([ids[0], ids[1], ids[2], ids[3], ids[5]], "released")]
+    assert len(results) == 7
+    assert [r.name for r in results[0:6:2]] == ["bundle-00", "bundle-02", "cached"]
+    assert results[4] is cached_bundle
+    assert results[6] is results[0]
+    for i in (1, 3, 5):
+        assert isinstance(results[i], ResolutionFailure)
+    assert object_cache[ids[2]] is results[2]
+
+
+class MockNode(KGObject):
+    default_space = "mock"
+    type_ = "https://openminds.ebrains.eu/mock/MockNode"
+    context = {
+        "vocab": "https://openminds.ebrains.eu/vocab/",
+    }
+    properties = [
+        Property("name", str, "vocab:name", multiple=False, required=False),
+        Property("subnodes", "test_base.MockNode", "vocab:subnodes", multiple=True, required=False),
+    ]
+    reverse_properties = []
+
+
+class MockTreeClient:
+    """Mock client for a binary tree of MockNodes, in which node n has children 2n+1 and 2n+2"""
+
+    node_ids = [f"{ID_NAMESPACE}00000000-0000-0000-0004-{n:012d}" for n in range(15)]
+
+    def __init__(self):
+        self.requests = []
+
+    def instances_from_full_uris(self, uris, use_cache=True, scope="released"):
+        self.requests.append(list(uris))
+        return {uri: self.node_data(self.node_ids.index(uri)) for uri in uris}
+
+    def node_data(self, n):
+        return {
+            "@id": self.node_ids[n],
+            "@type": [MockNode.type_],
+            "vocab:name": f"node-{n}",
+            "vocab:subnodes": [
+                {"@id": self.node_ids[child], "@type": [MockNode.type_]}
+                for child in (2 * n + 1, 2 * n + 2)
+                if child < len(self.node_ids)
+            ],
+        }
+
+
+def test_resolve_follows_links_level_by_level():
+    client = MockTreeClient()
+    root = MockNode.from_kg_instance(client.node_data(0), client)
+    root.resolve(client, follow_links={"subnodes": {"subnodes": {}}}, use_cache=False)
+
+    # one request per level, rather than one per node
+    ids = client.node_ids
+    assert client.requests == [ids[1:3], ids[3:7]]
+    assert [child.name for child in root.subnodes] == ["node-1", "node-2"]
+    assert [grandchild.name for grandchild in root.subnodes[1].subnodes] == ["node-5", "node-6"]
+    # links beyond the requested depth are not followed
+    assert isinstance(root.subnodes[1].subnodes[0].subnodes[0], KGProxy)
+
+
+class MockSlowTreeClient(MockTreeClient):
+    """Mock tree client that records how many requests are in progress at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.in_progress = 0
+        self.max_in_progress = 0
+        self.lock = threading.Lock()
+
+    def instances_from_full_uris(self, uris, use_cache=True, scope="released"):
+        with self.lock:
+            self.in_progress += 1
+            self.max_in_progress = max(self.max_in_progress, self.in_progress)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_progress -= 1
+        return super().instances_from_full_uris(uris, use_cache=use_cache, scope=scope)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_resolve_with_max_workers(monkeypatch, max_workers):
+    monkeypatch.setattr(fairgraph.kgproxy, "MAX_INSTANCES_PER_REQUEST", 1)
+    client = MockSlowTreeClient()
+    root = MockNode.from_kg_instance(client.node_data(0), client)
+    root.resolve(client, follow_links={"subnodes": {"subnodes": {"subnodes": {}}}}, max_workers=max_workers)
+
+    assert len(client.requests) == 14
+    assert client.max_in_progress == max_workers
+    leaves = [leaf for child in root.subnodes for grandchild in child.subnodes for leaf in grandchild.subnodes]
+    assert [leaf.name for leaf in leaves] == [f"node-{n}" for n in range(7, 15)]
+
+
+class MockCycleClient(MockTreeClient):
+    """Mock client for three MockNodes linked in a cycle, where node n also links to itself"""
+
+    def node_data(self, n):
+        data = super().node_data(n)
+        data["vocab:subnodes"] = [
+            {"@id": self.node_ids[child], "@type": [MockNode.type_]} for child in ((n + 1) % 3, n)
+        ]
+        return data
+
+
+def test_traverse():
+    client = MockTreeClient()
+    root = MockNode.from_kg_instance(client.node_data(0), client)
+    ids = client.node_ids
+
+    nodes = list(root.traverse(client, max_depth=2))
+    assert [(path, node.id) for path, node in nodes] == [
+        (("subnodes",), ids[1]),
+        (("subnodes",), ids[2]),
+        (("subnodes", "subnodes"), ids[3]),
+        (("subnodes", "subnodes"), ids[4]),
+        (("subnodes", "subnodes"), ids[5]),
+        (("subnodes", "subnodes"), ids[6]),
+    ]
+    # nodes at the maximum depth are not retrieved
+    assert client.requests == [ids[1:3]]
+    assert isinstance(nodes[0][1], MockNode)
+    assert isinstance(nodes[-1][1], KGProxy)
+    assert [node.id for node in root.children(client)] == ids[1:3]
+
+    # without batching, nodes are only retrieved when needed
+    for uri in ids:
+        object_cache.pop(uri, None)
+    client.requests = []
+    path, first = next(root.traverse(client, batch=False))
+    assert first.name == "node-1"
+    assert client.requests == [ids[1:2]]
+
+
+def test_traverse_with_cycles():
+    client = MockCycleClient()
+    root = MockNode.from_kg_instance(client.node_data(0), client)
+    nodes = [node for path, node in root.traverse(client)]
+    assert [node.name for node in nodes] == ["node-1", "node-2"]
+    # unlike traverse(), children() returns every link, including links back to the object itself
+    ids = client.node_ids
+    assert [node.id for node in root.children(client)] == [ids[1], ids[0]]
+    nodes = [node for path, node in root.traverse(client, follow=lambda prop, cls: prop.name != "subnodes")]
+    assert nodes == []
+
+
+def test_resolve_proxy_with_several_classes():
+    uri = f"{ID_NAMESPACE}00000000-0000-0000-0005-000000000001"
+
+    class MockSingleInstanceClient:
+        def __init__(self):
+            self.requests = []
+
+        def instance_from_full_uri(self, uri, use_cache=True, scope="released"):
+            self.requests.append(uri)
+            return {"@id": uri, "@type": [MockBundle.type_], "vocab:name": "bundle"}
+
+    client = MockSingleInstanceClient()
+    bundle = KGProxy([MockFile, MockBundle], uri).resolve(client)
+    assert isinstance(bundle, MockBundle)
+    assert bundle.name == "bundle"
+    # the document is retrieved only once, whatever the number of candidate classes
+    assert client.requests == [uri]
+    object_cache.pop(uri, None)
+
+    with pytest.raises(ResolutionFailure):
+        KGProxy([MockFile, MockNode], uri).resolve(client)
+
+
+def test_build_object_with_several_classes():
+    prop = Property("parts", [MockFile, MockBundle], "vocab:hasPart", multiple=True)
+    data = [
+        {"@id": f"{ID_NAMESPACE}00000000-0000-0000-0005-000000000002", "@type": [MockBundle.type_]},
+        {"@id": f"{ID_NAMESPACE}00000000-0000-0000-0005-000000000003", "@type": [MockFile.type_]},
+    ]
+    parts = prop.deserialize(data, client=None)
+    assert [part.classes for part in parts] == [[MockBundle], [MockFile]]
+
+
+def test_batching():
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0006-{n:012d}" for n in range(4)]
+    client = MockBulkClient()
+    with batching(client):
+        bundles = [KGProxy(MockBundle, uri).resolve(client) for uri in ids[:3]]
+        assert client.requests == []
+        assert all(isinstance(bundle, DeferredObject) for bundle in bundles)
+        # using any of the objects retrieves them all
+        assert bundles[2].name == "bundle-02"
+        assert client.requests == [(ids[:3], "released")]
+        assert isinstance(bundles[0].result(), MockBundle)
+        with pytest.raises(ResolutionFailure):
+            bundles[1].name
+        KGProxy(MockBundle, ids[3]).resolve(client)
+    # pending objects are retrieved at the end of the block
+    assert client.requests[-1] == ([ids[3]], "released")
+    # outside the block, and for cached objects, resolution is immediate
+    assert isinstance(KGProxy(MockBundle, ids[0]).resolve(client), MockBundle)
+
+
+class MockNestedResolutionClient(MockBulkClient):
+    """Mock bulk client which, while retrieving the first bundle, resolves another proxy"""
+
+    def __init__(self, nested_id):
+        super().__init__()
+        self.nested_id = nested_id
+        self.nested = []
+
+    def instance_from_full_uri(self, uri, use_cache=True, scope="released"):
+        return {"@id": uri, "@type": [MockBundle.type_], "vocab:name": f"bundle-{uri[-2:]}"}
+
+    def instances_from_full_uris(self, uris, use_cache=True, scope="released"):
+        if uris[0].endswith("00"):
+            self.nested.append(KGProxy(MockBundle, self.nested_id).resolve(self))
+        return super().instances_from_full_uris(uris, use_cache=use_cache, scope=scope)
+
+
+def test_batching_with_nested_resolution(monkeypatch):
+    # one request per proxy, so that the requests are made from worker threads
+    monkeypatch.setattr(fairgraph.kgproxy, "MAX_INSTANCES_PER_REQUEST", 1)
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0007-{n:012d}" for n in range(3)]
+    client = MockNestedResolutionClient(nested_id=ids[2])
+
+    def _run():
+        with batching(client, max_workers=2):
+            bundles = [KGProxy(MockBundle, uri).resolve(client) for uri in ids[:2]]
+            bundles[0].name
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), "deadlock in ResolutionBatch.flush()"
+    # the nested resolution was carried out immediately, not deferred
+    assert isinstance(client.nested[0], MockBundle)
+
+
+def test_deferred_objects_as_property_values():
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0008-{n:012d}" for n in range(2)]
+    client = MockBulkClient()
+    with batching(client):
+        file = MockFile(name="file", is_part_of=[KGProxy(MockBundle, uri).resolve(client) for uri in ids[:1]])
+        # validation does not trigger retrieval
+        assert file.is_part_of[0]._result is None
+        assert validate([file]) == []
+        data = file.to_jsonld(follow_links=True)
+    bundle_data = data["https://openminds.ebrains.eu/vocab/isPartOf"]
+    assert bundle_data["@id"] == ids[0]
+    assert bundle_data["https://openminds.ebrains.eu/vocab/name"] == "bundle-00"
+
+
+class MockPrefetchClient(MockFileClient):
+    """Mock client that can also return bundles in bulk"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def instances_from_full_uris(self, uris, use_cache=True, scope="released"):
+        self.requests.append(list(uris))
+        return {
+            uri: {"@id": uri, "@type": [MockBundle.type_], "vocab:name": f"bundle-{uri[-2:]}"} for uri in uris
+        }
+
+
+def test_list_with_prefetch():
+    client = MockPrefetchClient()
+    bundle_ids = MockFileClient.all_bundle_ids[:3]
+    files = MockFile.list(client, is_part_of=bundle_ids, prefetch=["is_part_of"])
+
+    # a single query, plus a single request for all the linked bundles
+    assert len(client.queries) == 1
+    assert len(client.requests) == 1
+    assert sorted(client.requests[0]) == sorted(MockFileClient.all_bundle_ids)
+    shared_file = files[-1]
+    assert [bundle.name for bundle in shared_file.is_part_of[:3]] == ["bundle-00", "bundle-01", "bundle-02"]
+    for file, bundle in zip(files[:3], shared_file.is_part_of):
+        assert file.is_part_of is bundle
+
+    with pytest.raises(ValueError):
+        MockFile.list(client, is_part_of=bundle_ids, prefetch=["name"])
+
+
+class MockReleaseClient(MockTreeClient):
+    """Mock tree client in which the even-numbered nodes have already been released"""
+
+    def __init__(self, fail_once=()):
+        super().__init__()
+        self.status_requests = []
+        self.released = []
+        self.fail_once = set(fail_once)
+
+    def are_released(self, uris, with_children=False):
+        self.status_requests.append(list(uris))
+        return {uri: self.node_ids.index(uri) % 2 == 0 for uri in uris}
+
+    def release(self, uri):
+        if uri in self.fail_once:
+            self.fail_once.remove(uri)
+            raise Exception("release failed")
+        self.released.append(uri)
+        return f"released {uri}"
+
+
+def test_release_plan():
+    client = MockReleaseClient(fail_once=[MockTreeClient.node_ids[1]])
+    ids = client.node_ids
+    root = MockNode.from_kg_instance(client.node_data(0), client)
+    plan = ReleasePlan(root, client, max_depth=2)
+
+    assert len(plan.nodes) == 7
+    assert len(client.status_requests) == 1
+    # only unreleased nodes are released, deepest first
+    assert [node.id for node in plan.outstanding] == [ids[3], ids[5], ids[1]]
+    progress = []
+    assert not plan.execute(progress=lambda node, n_done, n_total: progress.append((n_done, n_total)))
+    assert client.released == [ids[3], ids[5]]
+    assert list(plan.failures) == [ids[1]]
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+    # the plan can be resumed
+    assert plan.execute()
+    assert client.released == [ids[3], ids[5], ids[1]]
+    assert plan.outstanding == []
+
+
+def test_release_plan_with_shared_child():
+    ids = MockTreeClient.node_ids
+    # the root links to A and to B, and A also links to B (all odd-numbered, so unreleased)
+    node_b = MockNode(name="B", id=ids[5])
+    node_a = MockNode(name="A", id=ids[3], subnodes=[node_b])
+    root = MockNode(name="root", id=ids[1], subnodes=[node_a, node_b])
+    client = MockReleaseClient()
+    plan = ReleasePlan(root, client, max_depth=None)
+
+    # B is a child of A, so must be released before it, even though both are linked from the root
+    assert {height: [node.name for node in nodes] for height, nodes in plan.levels.items()} == {
+        0: ["B"],
+        1: ["A"],
+        2: ["root"],
+    }
+    assert plan.execute()
+    assert client.released == [ids[5], ids[3], ids[1]]
+
+
+class MockReleaseStatusClient(MockReleaseClient):
+    def __init__(self, fail_once=()):
+        super().__init__(fail_once=fail_once)
+        self.status_checks = []
+
+    def is_released(self, uri, with_children=False):
+        self.status_checks.append((uri, with_children))
+        return False
+
+
+def test_release_with_children():
+    ids = MockTreeClient.node_ids
+    root = MockNode(name="root", id=ids[1], subnodes=[MockNode(name="child", id=ids[3])])
+
+    # if the node and its children are already released, there is nothing more to do
+    client = MockReleaseClient()
+    client.is_released = lambda uri, with_children=False: True
+    root.release(client, with_children=True)
+    assert client.status_requests == []
+    assert client.released == []
+
+    client = MockReleaseStatusClient(fail_once=[ids[3]])
+    with pytest.raises(ReleaseError) as exc_info:
+        root.release(client, with_children=True)
+    assert client.status_checks == [(ids[1], True)]
+    assert list(exc_info.value.failures) == [ids[3]]
+    assert client.released == []
+
+    # as without children, the response for the node itself is returned
+    assert root.release(client, with_children=True) == f"released {ids[1]}"
+    assert client.released == [ids[3], ids[1]]
+
+
+class MockSlowBulkClient(MockBulkClient):
+    """Mock bulk client whose requests take 0.2 s, and, like those of KGClient, time out at the deadline"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def instances_from_full_uris(self, uris, use_cache=True, scope="released"):
+        remaining = remaining_time()
+        if remaining is not None and remaining < 0.2:
+            self.clock.advance(remaining)
+            raise DeadlineExceeded("Deadline exceeded")
+        self.clock.advance(0.2)
+        return super().instances_from_full_uris(uris, use_cache=use_cache, scope=scope)
+
+
+def test_resolve_many_with_timeout(monkeypatch, mock_clock):
+    monkeypatch.setattr(fairgraph.kgproxy, "MAX_INSTANCES_PER_REQUEST", 2)
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0005-{n:012d}" for n in (0, 2, 4, 6)]
+    proxies = [KGProxy(MockBundle, uri) for uri in ids]
+    client = MockSlowBulkClient(mock_clock)
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        resolve_many(proxies, client, max_workers=1, timeout=0.3)
+    # the first request completed before the deadline, the second was abandoned at the deadline
+    partial_results = exc_info.value.partial_results
+    assert [r.name for r in partial_results[:2]] == ["bundle-00", "bundle-02"]
+    assert partial_results[2:] == proxies[2:]
+    assert remaining_time() is None
+
+
+def test_to_jsonld_with_shared_nodes_and_cycles():
+    ids = [f"{ID_NAMESPACE}00000000-0000-0000-0006-{n:012d}" for n in range(3)]
+    root = MockNode(name="root", id=ids[0])
+    shared = MockNode(name="shared", id=ids[1], subnodes=[root])  # cycle back to the root
+    root.subnodes = [MockNode(name="branch", id=ids[2], subnodes=[shared]), shared]
+    subnodes = "https://openminds.ebrains.eu/vocab/subnodes"
+
+    # each node is serialized in full only once, then referenced by id
+    data = root.to_jsonld(follow_links=True)
+    branch_data, shared_ref = data[subnodes]
+    assert branch_data["@id"] == ids[2]
+    assert branch_data[subnodes]["https://openminds.ebrains.eu/vocab/name"] == "shared"
+    assert branch_data[subnodes][subnodes] == {"@id": ids[0]}
+    assert shared_ref == {"@id": ids[1]}
+
+    graph = root.to_jsonld(follow_links=True, flatten=True)["@graph"]
+    assert [node["@id"] for node in graph] == ids[:1] + ids[2:] + ids[1:2]
+    assert graph[0][subnodes] == [{"@id": ids[2]}, {"@id": ids[1]}]
+    assert graph[2][subnodes] == {"@id": ids[0]}
@@ -225,3 +225,90 @@ def test_delete_instance(kg_client, mocker):
     mocker.patch.object(kg_client._kg_client.instances, "delete")
     response = kg_client.delete_instance("some-id")
     kg_client._kg_client.instances.delete.assert_called_once_with("some-id")
+
+
+class MockStreamedResponse:
+    """Mock response from requests, whose body is read when json() is called"""
+
+    def __init__(self, read_error=None, status_code=200):
+        self.read_error = read_error
+        self.status_code = status_code
+
+    def json(self):
+        if self.read_error:
+            raise self.read_error
+        return {"data": []}
+
+
+@pytest.fixture
+def offline_kg_client(monkeypatch):
+    import requests
+    from fairgraph.client import KGClient
+
+    # kg_core looks up the authorization endpoint when it is created
+    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: MockStreamedResponse(status_code=404))
+    return KGClient(token="not-a-real-token", host="kg.example.org")
+
+
+def test_requests_use_remaining_time_as_timeout(offline_kg_client, monkeypatch):
+    import requests
+    from fairgraph.errors import DeadlineExceeded
+    from fairgraph.utility import deadline
+
+    timeouts = []
+
+    def mock_request(**kwargs):
+        timeouts.append(kwargs.get("timeout"))
+        return MockStreamedResponse()
+
+    monkeypatch.setattr(requests, "request", mock_request)
+    instances = offline_kg_client._kg_client.instances
+    instances._get("instances", {})
+    with deadline(10):
+        response = instances._get("instances", {})
+    assert timeouts[0] is None
+    assert 9 < timeouts[1] <= 10
+    # the timeout is not kept for requesting further pages
+    assert "timeout" not in response._request_arguments
+
+    def mock_timeout(**kwargs):
+        raise requests.ReadTimeout()
+
+    monkeypatch.setattr(requests, "request", mock_timeout)
+    with pytest.raises(requests.ReadTimeout):
+        instances._get("instances", {})
+    with pytest.raises(DeadlineExceeded):
+        with deadline(10):
+            instances._get("instances", {})
+
+
+def test_deadline_while_reading_response_body(offline_kg_client, monkeypatch):
+    import requests
+    from urllib3.exceptions import ReadTimeoutError
+    from fairgraph.errors import DeadlineExceeded
+    from fairgraph.utility import deadline
+
+    # kg_core streams responses, so a timeout while reading the body is reported as a ConnectionError
+    read_timeout = requests.ConnectionError(ReadTimeoutError(None, None, "Read timed out."))
+    monkeypatch.setattr(requests, "request", lambda **kwargs: MockStreamedResponse(read_timeout))
+    instances = offline_kg_client._kg_client.instances
+    with pytest.raises(DeadlineExceeded):
+        with deadline(10):
+            instances._get("instances", {})
+
+    # other connection errors are not affected
+    monkeypatch.setattr(
+        requests, "request", lambda **kwargs: MockStreamedResponse(requests.ConnectionError("connection reset"))
+    )
+    with pytest.raises(requests.ConnectionError):
+        with deadline(10):
+            instances._get("instances", {})
+
+
+def test_deadlines_apply_only_to_fairgraph_clients(offline_kg_client):
+    import importlib
+    import requests
+
+    assert "_do_request" in vars(offline_kg_client._kg_client.instances)
+    # the requests module used by kg_core is not replaced, so other kg_core clients are not affected
+    assert importlib.import_module("kg_core.__communication").requests is requests
@@ -1,4 +1,5 @@
-from datetime import date
+from datetime import date, datetime
+from dateutil import parser as date_parser
 from uuid import uuid4
 from fairgraph.base import ErrorHandling
 from fairgraph.properties import Property
@@ -156,6 +157,21 @@ def test_deserialize():
     ]
 
 
+def test_deserialize_dates():
+    date_property = Property("the_date", date, "TheDate", error_handling=ErrorHandling.error)
+    assert date_property.deserialize("2024-03-15", client=None) == datetime(2024, 3, 15)
+    assert date_property.deserialize("2024-03-15T10:20:30.5", client=None) == datetime(2024, 3, 15, 10, 20, 30, 500000)
+    assert date_property.deserialize(["2024-03-15", "2024-03-15", "2023-12-01"], client=None) == [
+        datetime(2024, 3, 15),
+        datetime(2024, 3, 15),
+        datetime(2023, 12, 1),
+    ]
+    assert date_property.deserialize("", client=None) is None
+    # strings that are not in ISO 8601 format, or that have a time zone, are handled by dateutil
+    for value in ("15 March 2024", "2024-03-15T10:20:30Z", "2024-03-15T10:20:30+01:00"):
+        assert date_property.deserialize(value, client=None) == date_parser.parse(value)
+
+
 def test_get_filter_value():
     date_property = Property("the_date", date, "TheDate", error_handling=ErrorHandling.error)
     assert date_property.get_filter_value(date(2023, 6, 2)) == "2023-06-02"
@@ -166,3 +182,17 @@ def test_get_filter_value():
     object_property = Property("the_object", SomeOrganization, "TheObject", error_handling=ErrorHandling.error)
     obj = SomeOrganization(name="The University", alias="TU", id="https://kg.ebrains.eu/api/instances/the_id")
     assert object_property.get_filter_value(obj) == "https://kg.ebrains.eu/api/instances/the_id"
+
+
+def test_get_lookup_filter():
+    name_property = Property("name", str, "vocab:name", error_handling=ErrorHandling.error)
+    assert name_property.get_lookup_filter("exact", "Mouse").serialize() == {"op": "EQUALS", "value": "Mouse"}
+    assert name_property.get_lookup_filter("endswith", "ouse").serialize() == {"op": "ENDS_WITH", "value": "ouse"}
+    assert name_property.get_lookup_filter("isempty", True).serialize() == {"op": "IS_EMPTY"}
+    with pytest.warns(UserWarning):
+        # values containing "+" are truncated, so cannot be matched exactly
+        assert name_property.get_lookup_filter("exact", "ABC+D").serialize() == {"op": "STARTS_WITH", "value": "ABC"}
+    with pytest.raises(ValueError):
+        name_property.get_lookup_filter("isempty", False)
+    with pytest.raises(ValueError):
+        name_property.get_lookup_filter("fuzzy", "Mouse")
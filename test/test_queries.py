@@ -1,4 +1,5 @@
 import os
+from copy import deepcopy
 import json
 import pytest
 from kg_core.request import Stage, Pagination
@@ -506,3 +507,99 @@ def test_generate_query_with_follow_named_links(mock_client):
         )
         expected = json.load(fp)
         assert generated == expected
+
+
+def test_frozen_query_property():
+    prop = QueryProperty(
+        "https://openminds.ebrains.eu/vocab/format",
+        name="vocab:format",
+        properties=[QueryProperty("@id"), QueryProperty("@type")],
+    )
+    expected = prop.serialize()
+    prop.freeze()
+    assert prop.frozen
+    assert all(child.frozen for child in prop.properties)
+    assert prop.serialize() == expected
+    # the serialized form is cached, and cannot be modified
+    assert prop.serialize() is prop.serialize()
+    with pytest.raises(TypeError):
+        prop.serialize()["sort"] = True
+    with pytest.raises(AttributeError):
+        prop.sorted = True
+    with pytest.raises(AttributeError):
+        prop.add_property(QueryProperty("@id"))
+
+    prop_copy = prop.copy()
+    assert not prop_copy.frozen
+    prop_copy.sorted = True
+    assert prop_copy.serialize()["sort"] is True
+    assert "sort" not in prop.serialize()
+    assert prop_copy.properties[0] is prop.properties[0]
+
+
+def test_generated_queries_share_frozen_properties(mock_client):
+    follow_links = {"affiliations": {"member_of": {}}, "contact_information": {}}
+    query1 = omcore.Person.generate_query(space=None, client=mock_client, follow_links=follow_links)
+    query2 = omcore.Person.generate_query(space=None, client=mock_client, follow_links=follow_links)
+    assert query1 == query2
+    assert query1 != omcore.Person.generate_query(space=None, client=mock_client, follow_links=None)
+
+    query4 = omcore.License.generate_query(space=None, client=mock_client)
+    sorted_props = [prop for prop in query4["structure"] if prop.get("sort")]
+    assert len(sorted_props) == 1
+    # sorting is applied to a copy, so it should not leak into the cached query properties
+    name_prop = omcore.License._property_lookup["full_name"]
+    assert not name_prop.get_query_properties()[0].sorted
+
+
+def test_modifying_generated_query_does_not_affect_later_queries(mock_client):
+    follow_links = {"affiliations": {"member_of": {}}}
+    query1 = omcore.Person.generate_query(space=None, client=mock_client, follow_links=follow_links)
+    expected = deepcopy(query1)
+    # the top level of a generated query belongs to the caller
+    query1["@id"] = "https://kg.ebrains.eu/api/instances/00000000-0000-0000-0000-000000000000"
+    # parts shared with other queries cannot be modified
+    affiliations = [prop for prop in query1["structure"] if prop.get("propertyName") == "vocab:affiliation"][0]
+    with pytest.raises(TypeError):
+        affiliations["filter"] = {"op": "EQUALS", "value": "modified"}
+    with pytest.raises(TypeError):
+        affiliations["structure"].append({"path": "https://openminds.ebrains.eu/vocab/modified"})
+    # but a deep copy can be
+    query3 = deepcopy(query1)
+    affiliations = [prop for prop in query3["structure"] if prop.get("propertyName") == "vocab:affiliation"][0]
+    affiliations["filter"] = {"op": "EQUALS", "value": "modified"}
+    affiliations["structure"][0]["required"] = True
+    query2 = omcore.Person.generate_query(space=None, client=mock_client, follow_links=follow_links)
+    assert query2 == expected
+    assert json.loads(json.dumps(query2)) == expected
+
+
+def test_generate_query_with_lookups(mock_client):
+    query = omcore.Model.generate_query(
+        space=None,
+        client=mock_client,
+        filters={"name__exact": "AdEx model", "alias__startswith": "AdEx", "description__isempty": True},
+    )
+    filter_props = {prop["propertyName"]: prop for prop in query["structure"] if prop.get("propertyName", "").startswith("Q")}
+    assert filter_props["Qfull_name"]["filter"] == {"op": "EQUALS", "value": "AdEx model"}
+    assert filter_props["Qfull_name"]["required"] is True
+    assert filter_props["Qshort_name"]["filter"] == {"op": "STARTS_WITH", "value": "AdEx"}
+    assert filter_props["Qdescription"]["filter"] == {"op": "IS_EMPTY"}
+    assert "required" not in filter_props["Qdescription"]
+
+
+def test_generate_query_with_lookup_across_links(mock_client):
+    query = omcore.Person.generate_query(
+        space=None,
+        client=mock_client,
+        filters={"affiliations__member_of__alias__regex": "^FZ.+"},
+    )
+    filter_props = [prop for prop in query["structure"] if prop.get("propertyName") == "Qaffiliations"]
+    member_of = filter_props[0]["structure"][0]
+    assert member_of["structure"][0]["filter"] == {"op": "REGEX", "value": "^FZ.+"}
+
+
+def test_query_components_have_no_instance_dict():
+    prop = QueryProperty("https://openminds.ebrains.eu/vocab/name", filter=Filter("EQUALS", value="foo"))
+    assert not hasattr(prop, "__dict__")
+    assert not hasattr(prop.filter, "__dict__")
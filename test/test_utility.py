@@ -1,8 +1,22 @@
 import os
 import tempfile
+import threading
 import pytest
-from fairgraph.utility import expand_filter, compact_uri, in_notebook, accepted_terms_of_use, sha1sum
-from .utils import kg_client, skip_if_no_connection
+import fairgraph.utility
+from fairgraph.errors import DeadlineExceeded
+from fairgraph.utility import (
+    expand_filter,
+    compact_uri,
+    in_notebook,
+    accepted_terms_of_use,
+    sha1sum,
+    InternTable,
+    deadline,
+    remaining_time,
+    iterate_with_deadline,
+    parallel_map,
+)
+from .utils import kg_client, skip_if_no_connection, mock_clock
 
 
 def test_expand_filter():
@@ -57,3 +71,91 @@ def test_sha1sum():
     fp.close()
     assert sha1sum(fp.name) == "80a963e503e9ed478c2cc528fd344d58122929c2"
     os.remove(fp.name)
+
+
+def test_intern_table():
+    intern = InternTable(maxsize=3)
+    prefix = "https://kg.ebrains.eu/api/instances/"
+    a = intern(prefix + "a")
+    assert intern(prefix + "a") is a
+    assert len(intern) == 1
+    for name in "bcd":
+        intern(prefix + name)
+    # the table is emptied when full, so memory use is bounded
+    assert len(intern) == 1
+    assert intern(prefix + "a") is not a
+
+
+def test_deadline(mock_clock):
+    assert remaining_time() is None
+    with deadline(10):
+        assert remaining_time() == 10
+        mock_clock.advance(3)
+        with deadline(100):
+            # nested deadlines cannot extend the outer one
+            assert remaining_time() == 7
+        with deadline(2):
+            assert remaining_time() == 2
+        with deadline(None):
+            assert remaining_time() == 7
+        mock_clock.advance(10)
+        assert remaining_time() == 0
+    assert remaining_time() is None
+
+
+def test_iterate_with_deadline(mock_clock):
+    def slow_items():
+        for i in range(10):
+            mock_clock.advance(1)
+            yield i
+
+    results = []
+    with pytest.raises(DeadlineExceeded):
+        for item in iterate_with_deadline(slow_items(), 2.5):
+            results.append(item)
+    assert results == [0, 1, 2]
+    assert list(iterate_with_deadline(slow_items(), None)) == list(range(10))
+
+
+def test_parallel_map():
+    in_progress = []
+    max_in_progress = []
+    lock = threading.Lock()
+
+    def task(x):
+        with lock:
+            in_progress.append(x)
+            max_in_progress.append(len(in_progress))
+        # nested calls run sequentially in the worker thread
+        result = list(parallel_map(lambda y: (threading.current_thread(), y), [x, x], max_workers=2))
+        with lock:
+            in_progress.remove(x)
+        return result
+
+    results = list(parallel_map(task, range(8), max_workers=3))
+    assert [[y for thread, y in result] for result in results] == [[x, x] for x in range(8)]
+    assert all(result[0][0] is result[1][0] is not threading.current_thread() for result in results)
+    assert max(max_in_progress) <= 3
+    # the threads are shared between calls
+    assert len(fairgraph.utility._get_executor()._threads) <= fairgraph.utility.MAX_THREADS
+
+
+def test_parallel_map_returns_at_deadline(mock_clock):
+    started = []
+    release = threading.Event()
+
+    def blocked(x):
+        started.append(x)
+        release.wait(5)
+        return x
+
+    results = parallel_map(blocked, range(6), max_workers=2)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            with deadline(1):
+                mock_clock.advance(2)
+                list(results)
+    finally:
+        release.set()
+    # no more than `max_workers` tasks were started, and the others were cancelled
+    assert len(started) <= 2
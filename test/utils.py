@@ -1,6 +1,7 @@
 from copy import deepcopy
 from uuid import uuid4
 from requests.exceptions import SSLError
+from fairgraph.caching import object_cache
 from fairgraph.client import KGClient
 from fairgraph.errors import AuthenticationError
 
@@ -152,3 +153,33 @@ class MockKGClient:
 @pytest.fixture
 def mock_client():
     return MockKGClient()
+
+
+class MockClock:
+    """Stand-in for the `time` module in fairgraph.utility, whose monotonic clock only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def mock_clock(monkeypatch):
+    clock = MockClock()
+    monkeypatch.setattr("fairgraph.utility.time", clock)
+    return clock
+
+
+@pytest.fixture
+def clean_object_cache():
+    """Run the test with an empty object cache, and restore the previous contents afterwards, even if the test fails"""
+    saved = dict(object_cache)
+    object_cache.clear()
+    yield object_cache
+    object_cache.clear()
+    object_cache.update(saved)